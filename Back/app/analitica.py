@@ -0,0 +1,192 @@
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+
+# Analítica de flota sobre arreglos columnares: todo se resuelve con operaciones de numpy por
+# columna, sin recorrer filas en Python. Este módulo se importa dentro del endpoint para que numpy
+# no entre en el arranque del servidor (ver benchmarks/arranque.py)
+
+# Orden de las columnas que entrega crud.datos_analitica; fecha llega como días desde 1970-01-01.
+# Las filas vienen ordenadas por vehículo, fecha y kilometraje: así el historial de cada vehículo
+# es un tramo contiguo y no hace falta ordenar en memoria
+COLUMNAS = ("id", "vehiculo_id", "proveedor_id", "tipo_id", "dia", "kilometraje", "costo")
+
+# Iglewicz y Hoaglin: 0.6745 lleva la MAD a la escala de la desviación estándar
+FACTOR_MAD = 0.6745
+
+
+def a_columnas(filas: Sequence[tuple]) -> Dict[str, np.ndarray]:
+    # Una sola conversión a float64: los NULL quedan como NaN. Las Row de SQLAlchemy se pasan antes a
+    # tuplas; numpy las recorrería como secuencias genéricas, diez veces más lento
+    if not len(filas):
+        matriz = np.empty((0, len(COLUMNAS)))
+    elif isinstance(filas, np.ndarray):
+        matriz = filas.astype(np.float64, copy=False)
+    else:
+        matriz = np.array(list(map(tuple, filas)), dtype=np.float64)
+    return {nombre: matriz[:, i] for i, nombre in enumerate(COLUMNAS)}
+
+def _ordenar_por_vehiculo(c: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    # Solo se ordena si las filas no llegaron ordenadas (la comprobación es una pasada lineal)
+    veh, dia = c["vehiculo_id"], c["dia"]
+    mismo = veh[1:] == veh[:-1]
+    if not np.any(veh[1:] < veh[:-1]) and not np.any(mismo & (dia[1:] < dia[:-1])):
+        return c
+    orden = np.lexsort((c["kilometraje"], dia, veh))
+    return {nombre: columna[orden] for nombre, columna in c.items()}
+
+def _grupos(ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Ids de tipo y proveedor son enteros chicos: bincount reemplaza a np.unique, que ordena.
+    # Devuelve los ids presentes y, por fila, el índice denso de su grupo
+    ids = ids.astype(np.int64)
+    presentes = np.flatnonzero(np.bincount(ids))
+    rango = np.zeros(presentes[-1] + 1, dtype=np.uint16 if len(presentes) <= 65535 else np.int64)
+    rango[presentes] = np.arange(len(presentes))
+    return presentes, rango[ids]
+
+def _promedio_por_grupo(grupo: np.ndarray, valores: np.ndarray, n: int) -> np.ndarray:
+    validos = ~np.isnan(valores)
+    suma = np.bincount(grupo[validos], weights=valores[validos], minlength=n)
+    conteo = np.bincount(grupo[validos], minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(conteo > 0, suma / conteo, np.nan)
+
+def puntajes_atipicos(tipo: np.ndarray, costo: np.ndarray) -> np.ndarray:
+    # z robusto por tipo de mantención: un cambio de aceite se compara con otros cambios de aceite.
+    # Con MAD 0 (todos los costos iguales) el puntaje queda NaN y nunca cuenta como atípico
+    tipos, grupo = _grupos(tipo)
+    # Orden estable por grupo (radix sobre uint16) y mediana por partición en cada tramo; el ciclo
+    # recorre los tipos de mantención, no las filas
+    orden = np.argsort(grupo, kind="stable")
+    ordenados = costo[orden]
+    limites = np.r_[0, np.cumsum(np.bincount(grupo, minlength=len(tipos)))]
+    mediana, mad = np.empty(len(tipos)), np.empty(len(tipos))
+    for i, (desde, hasta) in enumerate(zip(limites[:-1].tolist(), limites[1:].tolist())):
+        tramo = ordenados[desde:hasta]
+        mediana[i] = np.median(tramo)
+        mad[i] = np.median(np.abs(tramo - mediana[i]))
+    desvio = costo - mediana[grupo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(mad[grupo] > 0, FACTOR_MAD * desvio / mad[grupo], np.nan)
+
+def _meses(dia: np.ndarray) -> np.ndarray:
+    # Meses desde 1970-01
+    return dia.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+def promedio_movil(valores: np.ndarray, ventana: int) -> np.ndarray:
+    # Los primeros meses promedian solo los que hay
+    acumulado = np.r_[0.0, np.cumsum(valores)]
+    fin = np.arange(1, len(valores) + 1)
+    inicio = np.maximum(fin - ventana, 0)
+    return (acumulado[fin] - acumulado[inicio]) / (fin - inicio)
+
+def _opcional(valores: np.ndarray) -> list:
+    return [None if v != v else v for v in valores.tolist()]
+
+
+def _por_vehiculo(c: Dict[str, np.ndarray], atipica: np.ndarray, patentes: Dict[int, str]) -> List[dict]:
+    # Cada vehículo es un tramo contiguo en orden cronológico: los intervalos salen de restar vecinos
+    veh, km, dia = c["vehiculo_id"], c["kilometraje"], c["dia"]
+    nuevo = np.r_[True, veh[1:] != veh[:-1]]
+    inicios = np.flatnonzero(nuevo)
+    g = np.cumsum(nuevo) - 1
+    ids, n = veh[inicios], len(inicios)
+    cantidad = np.diff(np.r_[inicios, len(veh)])
+    costo_total = np.add.reduceat(c["costo"], inicios)
+    atipicas = np.add.reduceat(atipica.astype(np.int64), inicios)
+    with np.errstate(invalid="ignore"):
+        recorrido = np.fmax.reduceat(km, inicios) - np.fmin.reduceat(km, inicios)
+    mismo = g[1:] == g[:-1]
+    km_entre = _promedio_por_grupo(g[1:][mismo], np.diff(km)[mismo], n)
+    dias_entre = _promedio_por_grupo(g[1:][mismo], np.diff(dia)[mismo], n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        costo_por_km = np.where(recorrido > 0, costo_total / recorrido, np.nan)
+
+    # Gasto mensual promedio entre el primer y el último mes con mantenciones
+    meses = c["mes"]
+    meses_activos = np.maximum.reduceat(meses, inicios) - np.minimum.reduceat(meses, inicios) + 1
+
+    return [
+        {
+            "vehiculo_id": vid, "patente": patentes.get(vid), "mantenciones": cant, "costo_total": total,
+            "km_recorridos": None if rec is None else int(rec), "costo_por_km": cpk,
+            "km_entre_mantenciones": kme, "dias_entre_mantenciones": de,
+            "gasto_mensual": total / ma, "atipicas": int(at),
+        }
+        for vid, cant, total, rec, cpk, kme, de, ma, at in zip(
+            ids.astype(np.int64).tolist(), cantidad.tolist(), costo_total.tolist(), _opcional(recorrido),
+            _opcional(costo_por_km), _opcional(km_entre), _opcional(dias_entre), meses_activos.tolist(),
+            atipicas.tolist(),
+        )
+    ]
+
+def _por_proveedor(c: Dict[str, np.ndarray], atipica: np.ndarray, proveedores: Dict[int, str]) -> List[dict]:
+    # proveedor_id 0 agrupa las mantenciones sin proveedor
+    ids, grupo = _grupos(c["proveedor_id"])
+    n = len(ids)
+    cantidad = np.bincount(grupo, minlength=n)
+    costo_total = np.bincount(grupo, weights=c["costo"], minlength=n)
+    atipicas = np.bincount(grupo, weights=atipica, minlength=n)
+    resultado = [
+        {
+            "proveedor_id": pid or None, "nombre": proveedores.get(pid, "Sin proveedor"), "mantenciones": cant,
+            "costo_total": total, "costo_promedio": total / cant, "atipicas": int(at),
+        }
+        for pid, cant, total, at in zip(
+            ids.astype(np.int64).tolist(), cantidad.tolist(), costo_total.tolist(), atipicas.tolist()
+        )
+    ]
+    return sorted(resultado, key=lambda p: p["costo_total"], reverse=True)
+
+def _por_mes(c: Dict[str, np.ndarray], ventana: int) -> List[dict]:
+    # Serie continua: los meses sin mantenciones aparecen con costo 0
+    meses = c["mes"]
+    primero = meses.min()
+    indice = meses - primero
+    costo_total = np.bincount(indice, weights=c["costo"])
+    cantidad = np.bincount(indice)
+    etiquetas = np.datetime_as_string((primero + np.arange(len(costo_total))).astype("datetime64[M]"))
+    return [
+        {"mes": mes, "costo_total": total, "cantidad": cant, "promedio_movil": movil}
+        for mes, total, cant, movil in zip(
+            etiquetas.tolist(), costo_total.tolist(), cantidad.tolist(), promedio_movil(costo_total, ventana).tolist()
+        )
+    ]
+
+def _atipicas(c: Dict[str, np.ndarray], puntaje: np.ndarray, atipica: np.ndarray, limite: int) -> List[dict]:
+    indices = np.flatnonzero(atipica)
+    indices = indices[np.argsort(-np.abs(puntaje[indices]), kind="stable")[:limite]]
+    fechas = c["dia"][indices].astype("datetime64[D]").tolist()
+    return [
+        {
+            "id": int(c["id"][i]), "vehiculo_id": int(c["vehiculo_id"][i]),
+            "proveedor_id": int(c["proveedor_id"][i]) or None, "tipo_id": int(c["tipo_id"][i]),
+            "fecha": fecha, "costo": float(c["costo"][i]), "puntaje": float(puntaje[i]),
+        }
+        for i, fecha in zip(indices.tolist(), fechas)
+    ]
+
+
+def analizar(
+    filas: Sequence[tuple],
+    patentes: Dict[int, str],
+    proveedores: Dict[int, str],
+    ventana: int = 3,
+    umbral: float = 3.5,
+    limite_atipicas: int = 100,
+) -> dict:
+    c = a_columnas(filas)
+    if not len(c["id"]):
+        return {"mantenciones": 0, "vehiculos": [], "proveedores": [], "meses": [], "atipicas": []}
+    c = _ordenar_por_vehiculo(c)
+    c["mes"] = _meses(c["dia"])
+
+    puntaje = puntajes_atipicos(c["tipo_id"], c["costo"])
+    with np.errstate(invalid="ignore"):
+        atipica = np.abs(puntaje) > umbral
+    return {
+        "mantenciones": len(c["id"]),
+        "vehiculos": _por_vehiculo(c, atipica, patentes),
+        "proveedores": _por_proveedor(c, atipica, proveedores),
+        "meses": _por_mes(c, ventana),
+        "atipicas": _atipicas(c, puntaje, atipica, limite_atipicas),
+    }
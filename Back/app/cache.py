@@ -0,0 +1,127 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+from fastapi import Request, Response
+from app.config import app_config
+
+CACHE_TTL = app_config.cache_ttl
+CACHE_MAX = app_config.cache_max
+# Con cache_url=redis://... los workers comparten cache e invalidaciones
+CACHE_URL = app_config.cache_url
+
+
+class EntradaCache(NamedTuple):
+    valor: Any
+    etag: str
+
+
+class BackendMemoria:
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self._datos: "OrderedDict[str, tuple]" = OrderedDict()
+        # Los contadores de generación van aparte para que el LRU nunca los descarte
+        self._contadores: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, clave: str) -> Optional[str]:
+        with self._lock:
+            if clave in self._contadores:
+                return str(self._contadores[clave])
+            item = self._datos.get(clave)
+            if item is None:
+                return None
+            valor, vence = item
+            if vence is not None and vence < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave: str, valor: str, ttl: Optional[int] = None):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ttl if ttl else None)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def incr(self, clave: str) -> int:
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + 1
+            return self._contadores[clave]
+
+
+class BackendRedis:
+    def __init__(self, url: str):
+        import redis
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, clave: str) -> Optional[str]:
+        return self._redis.get(clave)
+
+    def set(self, clave: str, valor: str, ttl: Optional[int] = None):
+        self._redis.set(clave, valor, ex=ttl)
+
+    def incr(self, clave: str) -> int:
+        return self._redis.incr(clave)
+
+
+class CacheLectura:
+    # Cada prefijo tiene un número de generación: invalidar es incrementarlo, y las
+    # entradas de la generación anterior dejan de leerse y expiran solas
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    def _clave(self, prefijo: str, clave: str) -> str:
+        generacion = self.backend.get(f"gen:{prefijo}") or "0"
+        return f"cache:{prefijo}:{generacion}:{clave}"
+
+    def _leer(self, clave_completa: str) -> Optional[EntradaCache]:
+        guardado = self.backend.get(clave_completa)
+        if guardado is None:
+            return None
+        datos = json.loads(guardado)
+        return EntradaCache(datos["valor"], datos["etag"])
+
+    def _guardar(self, clave_completa: str, valor: Any) -> EntradaCache:
+        serializado = json.dumps(valor, sort_keys=True, default=str)
+        entrada = EntradaCache(json.loads(serializado), f'"{hashlib.sha1(serializado.encode()).hexdigest()}"')
+        self.backend.set(clave_completa, json.dumps({"valor": entrada.valor, "etag": entrada.etag}), self.ttl)
+        return entrada
+
+    def leer(self, prefijo: str, clave: str, cargar: Callable[[], Any]) -> EntradaCache:
+        clave_completa = self._clave(prefijo, clave)
+        return self._leer(clave_completa) or self._guardar(clave_completa, cargar())
+
+    async def leer_async(self, prefijo: str, clave: str, cargar: Callable[[], Awaitable[Any]]) -> EntradaCache:
+        clave_completa = self._clave(prefijo, clave)
+        return self._leer(clave_completa) or self._guardar(clave_completa, await cargar())
+
+    def invalidar(self, *prefijos: str):
+        for prefijo in prefijos:
+            self.backend.incr(f"gen:{prefijo}")
+
+
+cache = CacheLectura(BackendRedis(CACHE_URL) if CACHE_URL else BackendMemoria(CACHE_MAX), CACHE_TTL)
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    # RFC 9110 §13.1.2: lista separada por comas, comparación débil (se ignora W/) y * coincide con todo
+    if not if_none_match:
+        return False
+    valor = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or (candidato[2:] if candidato.startswith("W/") else candidato) == valor:
+            return True
+    return False
+
+
+def no_modificado(request: Request, etag: str) -> Optional[Response]:
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
@@ -0,0 +1,150 @@
+import os
+import tempfile
+from typing import Optional, Union
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from sqlalchemy.engine import make_url
+
+# Carga las variables desde .env
+load_dotenv()
+
+def _env_bool(nombre: str, defecto: bool) -> bool:
+    valor = os.getenv(nombre)
+    if valor is None or valor.strip() == "":
+        return defecto
+    return valor.strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+
+def _env_int(nombre: str, defecto: int) -> int:
+    valor = os.getenv(nombre)
+    if valor is None or valor.strip() == "":
+        return defecto
+    return int(valor)
+
+def _env_str(nombre: str, defecto: Optional[str] = None) -> Optional[str]:
+    valor = os.getenv(nombre)
+    if valor is None or valor.strip() == "":
+        return defecto
+    return valor.strip()
+
+
+class ConfiguracionDB(BaseModel):
+    user: Optional[str] = None
+    password: Optional[str] = None
+    host: Optional[str] = None
+    port: Optional[str] = None
+    dbname: Optional[str] = None
+    # database_url reemplaza a user/password/host/port/dbname (p. ej. una base local para benchmarks)
+    url_directa: Optional[str] = None
+
+    usar_async: bool = False
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: int = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    echo: Union[bool, str] = False
+    statement_timeout_ms: int = 0
+    pgbouncer: bool = False
+    max_consultas: int = 0
+
+    @property
+    def url(self) -> str:
+        if self.url_directa:
+            return self.url_directa
+        return f"postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.dbname}"
+
+    @property
+    def url_async(self) -> str:
+        if self.url_directa:
+            esquema, resto = self.url_directa.split("://", 1)
+            driver = "sqlite+aiosqlite" if esquema.startswith("sqlite") else "postgresql+asyncpg"
+            return f"{driver}://{resto}"
+        return f"postgresql+asyncpg://{self.user}:{self.password}@{self.host}:{self.port}/{self.dbname}"
+
+    @classmethod
+    def desde_entorno(cls) -> "ConfiguracionDB":
+        port = (os.getenv("port") or "").strip()
+        url_directa = (os.getenv("database_url") or "").strip() or None
+        if url_directa:
+            # Con database_url el puerto de .env no aplica: cuenta el de la URL
+            port_efectivo = str(make_url(url_directa).port or "")
+        else:
+            port_efectivo = port
+        echo = (os.getenv("db_echo") or "false").strip().lower()
+        return cls(
+            user=(os.getenv("user") or "").strip(),
+            password=os.getenv("password"),
+            host=(os.getenv("host") or "").strip(),
+            port=port,
+            dbname=(os.getenv("dbname") or "").strip(),
+            url_directa=url_directa,
+            usar_async=_env_bool("db_async", False),
+            pool_size=_env_int("db_pool_size", 5),
+            max_overflow=_env_int("db_max_overflow", 10),
+            pool_timeout=_env_int("db_pool_timeout", 30),
+            pool_recycle=_env_int("db_pool_recycle", 1800),
+            pool_pre_ping=_env_bool("db_pool_pre_ping", True),
+            # db_echo=debug también registra las filas devueltas
+            echo="debug" if echo == "debug" else _env_bool("db_echo", False),
+            statement_timeout_ms=_env_int("db_statement_timeout_ms", 0),
+            # 6543 es el puerto del pooler de Supabase (pgbouncer en modo transacción)
+            pgbouncer=_env_bool("db_pgbouncer", port_efectivo == "6543"),
+            # Tope de sentencias SQL por request (0 = sin tope); pensado para desarrollo y pruebas
+            max_consultas=_env_int("db_max_consultas", 0),
+        )
+
+
+db_config = ConfiguracionDB.desde_entorno()
+
+
+class ConfiguracionApp(BaseModel):
+    # Horas que se recuerda una Idempotency-Key
+    idempotencia_ttl_h: int = 24
+    # false obliga a calcular los agregados de reportes sobre mantenciones
+    reportes_resumen_mensual: bool = True
+
+    cache_ttl: int = 300
+    cache_max: int = 1024
+    # redis://... para que los workers compartan cache e invalidaciones
+    cache_url: Optional[str] = None
+
+    graficos_workers: int = 2
+    graficos_cache: int = 128
+
+    trabajos_workers: int = 2
+    trabajos_max_pendientes: int = 20
+    trabajos_retencion_s: int = 3600
+    # Al detener el servidor se espera hasta esto a los reportes que se están generando
+    trabajos_espera_cierre_s: int = 30
+    trabajos_dir: str = os.path.join(tempfile.gettempdir(), "fruselva_trabajos")
+
+    eventos_backend: str = "memoria"
+    eventos_buffer: int = 1000
+    eventos_pendientes_max: int = 500
+    eventos_url: Optional[str] = None
+    eventos_ping_s: int = 15
+
+    @classmethod
+    def desde_entorno(cls) -> "ConfiguracionApp":
+        return cls(
+            idempotencia_ttl_h=_env_int("idempotencia_ttl_h", 24),
+            reportes_resumen_mensual=_env_bool("reportes_resumen_mensual", True),
+            cache_ttl=_env_int("cache_ttl", 300),
+            cache_max=_env_int("cache_max", 1024),
+            cache_url=_env_str("cache_url"),
+            graficos_workers=_env_int("graficos_workers", 2),
+            graficos_cache=_env_int("graficos_cache", 128),
+            trabajos_workers=_env_int("trabajos_workers", 2),
+            trabajos_max_pendientes=_env_int("trabajos_max_pendientes", 20),
+            trabajos_retencion_s=_env_int("trabajos_retencion_s", 3600),
+            trabajos_espera_cierre_s=_env_int("trabajos_espera_cierre_s", 30),
+            trabajos_dir=_env_str("trabajos_dir", cls.model_fields["trabajos_dir"].default),
+            eventos_backend=_env_str("eventos_backend", "memoria").lower(),
+            eventos_buffer=_env_int("eventos_buffer", 1000),
+            eventos_pendientes_max=_env_int("eventos_pendientes_max", 500),
+            eventos_url=_env_str("eventos_url"),
+            eventos_ping_s=_env_int("eventos_ping_s", 15),
+        )
+
+
+app_config = ConfiguracionApp.desde_entorno()
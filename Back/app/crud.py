@@ -1,33 +1,191 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app import models, schemas
-from datetime import date
-from sqlalchemy.orm import joinedload
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from app import eventos, models, schemas
+from app.cache import EntradaCache, cache
+from app.config import app_config
+from app.paginacion import armar_pagina, consulta_paginada, paginar
+from app.serializacion import Serializador
+from datetime import date, datetime, timedelta, timezone
+import calendar
+import hashlib
+import json
+import re
+from sqlalchemy import (
+    Date, Integer, String, and_, bindparam, case, cast, column, delete, exists, func, insert, literal, literal_column,
+    or_, select, table, true, tuple_, update, values,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Row
 
 
+# --- FILAS DE LOS LISTADOS ---
+
+# Cada listado lee solo las columnas de su schema y devuelve dicts listos para orjson: sin entidades
+# ORM ni validación de pydantic por fila. Las relaciones anidadas (dirección del proveedor) van
+# con un LEFT JOIN en la misma consulta
+FILAS = {
+    "vehiculos": Serializador(schemas.Vehiculo),
+    "proveedores": Serializador(schemas.ProveedorOut),
+    "direcciones": Serializador(schemas.DireccionOut),
+    "mantenciones": Serializador(schemas.MantencionBase),
+    "programaciones": Serializador(schemas.ProgramarMantencion),
+    "reporte": Serializador(schemas.MantencionReporte),
+    "busqueda": Serializador(schemas.ResultadoBusqueda),
+    "historial": Serializador(schemas.HistorialMantencion),
+}
+
+# --- ESCRITURAS ---
+
+# Las altas y modificaciones van en un solo INSERT/UPDATE ... RETURNING: las restricciones únicas
+# reemplazan las consultas previas de existencia y la fila devuelta evita el refresh
+
+def _es_duplicado(e: IntegrityError) -> bool:
+    # 23505 = unique_violation en Postgres; SQLite solo lo indica en el mensaje
+    return getattr(e.orig, "pgcode", None) == "23505" or "UNIQUE constraint failed" in str(e.orig)
+
+def _error_integridad(db: Session, e: IntegrityError, duplicado: str) -> ValueError:
+    db.rollback()
+    if _es_duplicado(e):
+        return ValueError(duplicado)
+    return ValueError(str(e.orig).strip().splitlines()[0])
+
+def _insertar(db: Session, modelo, valores: dict, duplicado: str):
+    try:
+        return db.scalars(insert(modelo).values(**valores).returning(modelo)).one()
+    except IntegrityError as e:
+        raise _error_integridad(db, e, duplicado)
+
+def _actualizar(db: Session, modelo, id: int, valores: dict, duplicado: str):
+    try:
+        return db.scalars(update(modelo).where(modelo.id == id).values(**valores).returning(modelo)).one_or_none()
+    except IntegrityError as e:
+        raise _error_integridad(db, e, duplicado)
+
+def _valores_anteriores(db: Session, modelo, id: int, campos) -> Optional[dict]:
+    # La fila antes del UPDATE, bloqueada hasta el commit: el evento lleva solo lo que cambia
+    fila = db.execute(
+        select(*[getattr(modelo, c) for c in campos]).where(modelo.id == id).with_for_update()
+    ).mappings().first()
+    return dict(fila) if fila else None
+
+def _publicar_cambios(db: Session, entidad: str, id: int, anterior: dict, valores: dict):
+    cambios = {c: v for c, v in valores.items() if anterior[c] != v}
+    if cambios:
+        eventos.publicar(db, entidad, "actualizar", id, cambios)
+
+def _columnas(objeto) -> dict:
+    # Fila completa para los eventos de creación, sin cargar relaciones
+    return {c.key: getattr(objeto, c.key) for c in objeto.__mapper__.column_attrs}
+
 # --- VEHÍCULOS ---
 
 def get_vehiculo_por_patente(db: Session, patente: str) -> Optional[models.Vehiculo]:
     return db.query(models.Vehiculo).filter(models.Vehiculo.patente == patente).first()
 
-def obtener_vehiculos(db: Session) -> List[models.Vehiculo]:
-    return db.query(models.Vehiculo).all()
+def obtener_vehiculos(db: Session, cursor: Optional[str] = None, limite: Optional[int] = None, campos: Optional[str] = None):
+    return paginar(db, models.Vehiculo, [models.Vehiculo.id], cursor, limite, campos, serializador=FILAS["vehiculos"])
 
 def crear_vehiculo(db: Session, vehiculo: schemas.VehiculoCreate) -> models.Vehiculo:
-    db_vehiculo = models.Vehiculo(**vehiculo.dict())
-    db.add(db_vehiculo)
+    db_vehiculo = _insertar(db, models.Vehiculo, vehiculo.dict(), "La patente ya existe.")
+    eventos.publicar(db, "vehiculo", "crear", db_vehiculo.id, _columnas(db_vehiculo))
     db.commit()
-    db.refresh(db_vehiculo)
     return db_vehiculo
 
+def obtener_resumen_vehiculo(
+    db: Session, patente: str, cursor: Optional[str] = None, limite: int = 20
+) -> Optional[Tuple[dict, Optional[str]]]:
+    # Vehículo, totales y programaciones en una consulta (una fila por programación) y el historial
+    # paginado en otra; ambas entran por patente y por ix_mantenciones_vehiculo_fecha
+    V, M, P, T = models.Vehiculo, models.Mantencion, models.ProgramarMantencion, models.TipoMantencion
+    hoy = date.today()
+    totales = (
+        select(
+            func.count(M.id).label("mantenciones"),
+            func.coalesce(func.sum(M.costo), 0).label("costo_total"),
+            func.count(case((M.fecha >= date(hoy.year, 1, 1), M.id))).label("mantenciones_anio"),
+            func.coalesce(func.sum(case((M.fecha >= date(hoy.year, 1, 1), M.costo), else_=0)), 0).label("costo_anio"),
+            func.max(M.fecha).label("ultima_fecha"),
+        )
+        .join(V, M.vehiculo_id == V.id)
+        .where(V.patente == patente)
+        .cte("totales")
+    )
+    filas = db.execute(
+        select(
+            V.id, V.patente, V.marca, V.modelo, V.anio, V.kilometraje, totales,
+            P.id.label("programacion_id"), P.tipo_id, T.nombre.label("tipoMantencion"), P.frecuencia_km,
+            P.frecuencia_meses, P.ultima_fecha.label("programacion_ultima_fecha"), P.ultima_kilometraje,
+            P.siguiente_fecha_estimada, P.siguiente_kilometraje_estimado,
+        )
+        .select_from(V)
+        .join(totales, true())
+        .outerjoin(P, P.vehiculo_id == V.id)
+        .outerjoin(T, P.tipo_id == T.id)
+        .where(V.patente == patente)
+        .order_by(P.siguiente_fecha_estimada.asc().nulls_last(), P.id)
+    ).all()
+    if not filas:
+        return None
+
+    f = filas[0]
+    vehiculo = {"id": f.id, "patente": f.patente, "marca": f.marca, "modelo": f.modelo, "anio": f.anio, "kilometraje": f.kilometraje}
+    programaciones = []
+    for p in filas:
+        if p.programacion_id is None:
+            continue
+        km_restantes = (
+            p.siguiente_kilometraje_estimado - f.kilometraje
+            if p.siguiente_kilometraje_estimado is not None and f.kilometraje is not None else None
+        )
+        programaciones.append({
+            "id": p.programacion_id, "tipo_id": p.tipo_id, "tipoMantencion": p.tipoMantencion,
+            "frecuencia_km": p.frecuencia_km, "frecuencia_meses": p.frecuencia_meses,
+            "ultima_fecha": p.programacion_ultima_fecha, "ultima_kilometraje": p.ultima_kilometraje,
+            "siguiente_fecha_estimada": p.siguiente_fecha_estimada,
+            "siguiente_kilometraje_estimado": p.siguiente_kilometraje_estimado,
+            "km_restantes": km_restantes, **_vencimiento(p.siguiente_fecha_estimada, km_restantes, hoy),
+        })
+
+    historial, siguiente = [], None
+    if f.mantenciones:
+        base = (
+            select(
+                M.id, M.fecha, M.tipo_id, T.nombre.label("tipoMantencion"), M.proveedor_id,
+                models.Proveedor.nombre.label("proveedor"), M.descripcion, M.kilometraje, M.costo,
+            )
+            .select_from(M)
+            .outerjoin(T, M.tipo_id == T.id)
+            .outerjoin(models.Proveedor, M.proveedor_id == models.Proveedor.id)
+        )
+        stmt = consulta_paginada(
+            M, ORDEN_MANTENCIONES, cursor, limite, filtros=[M.vehiculo_id == f.id], descendente=True, base=base
+        )
+        filas_historial, siguiente = armar_pagina(db.execute(stmt).all(), ORDEN_MANTENCIONES, limite)
+        historial = FILAS["historial"].filas(filas_historial)
+
+    resumen = {
+        "vehiculo": vehiculo,
+        "totales": {
+            "mantenciones": f.mantenciones, "costo_total": float(f.costo_total),
+            "mantenciones_anio": f.mantenciones_anio, "costo_anio": float(f.costo_anio),
+            "ultima_fecha": f.ultima_fecha,
+        },
+        "programaciones": programaciones,
+        "historial": historial,
+        "historial_siguiente": siguiente,
+    }
+    return resumen, siguiente
+
 def actualizar_vehiculo(db: Session, id: int, datos: schemas.VehiculoCreate) -> Optional[models.Vehiculo]:
-    vehiculo = db.query(models.Vehiculo).filter(models.Vehiculo.id == id).first()
-    if not vehiculo:
+    valores = datos.dict()
+    anterior = _valores_anteriores(db, models.Vehiculo, id, valores)
+    if anterior is None:
+        db.rollback()
         return None
-    for key, value in datos.dict().items():
-        setattr(vehiculo, key, value)
+    vehiculo = _actualizar(db, models.Vehiculo, id, valores, "La patente ya existe.")
+    _publicar_cambios(db, "vehiculo", id, anterior, valores)
     db.commit()
-    db.refresh(vehiculo)
     return vehiculo
 
 def eliminar_vehiculo(db: Session, id: int) -> bool:
@@ -35,137 +193,533 @@ def eliminar_vehiculo(db: Session, id: int) -> bool:
     if not vehiculo:
         return False
     db.delete(vehiculo)
+    eventos.publicar(db, "vehiculo", "eliminar", id)
     db.commit()
     return True
 
-# --- PROVEEDORES ---
+def importar_vehiculos_lote(db: Session, lote: List[Tuple[int, dict]]) -> Tuple[int, List[schemas.ErrorImportacion]]:
+    patentes = [valores["patente"] for _, valores in lote]
+    existentes = {
+        patente for (patente,) in db.query(models.Vehiculo.patente).filter(models.Vehiculo.patente.in_(patentes))
+    }
+    errores, validos = [], []
+    for fila, valores in lote:
+        if valores["patente"] in existentes:
+            errores.append(schemas.ErrorImportacion(fila=fila, error="La patente ya existe."))
+        else:
+            existentes.add(valores["patente"])
+            validos.append((fila, valores))
+    insertados, errores_insercion = _insertar_lote(
+        db, models.Vehiculo, validos, lambda db, filas: eventos.publicar(db, "vehiculo", "recargar")
+    )
+    return insertados, errores + errores_insercion
 
-def obtener_proveedores(db: Session) -> List[schemas.ProveedorOut]:
-    proveedores = db.query(models.Proveedor).options(joinedload(models.Proveedor.direccion)).all()
-    return [schemas.ProveedorOut.model_validate(p, from_attributes=True) for p in proveedores]
+# --- KILOMETRAJE POR LOTE ---
 
-def crear_proveedor(db: Session, proveedor_in: schemas.ProveedorCreate) -> models.Proveedor:
-    existing = db.query(models.Proveedor).filter(models.Proveedor.nombre == proveedor_in.nombre).first()
-    if existing:
-        raise ValueError("Proveedor ya existe")
+MAXIMO_LECTURAS = 5000
+ENDPOINT_KILOMETRAJE = "PATCH /vehiculos/kilometraje"
 
-    direccion_obj = None
-    if proveedor_in.direccion_nueva:
-        direccion_obj = models.Direccion(**proveedor_in.direccion_nueva.model_dump())
-        db.add(direccion_obj)
-        db.flush()
-
-    proveedor = models.Proveedor(
-        nombre=proveedor_in.nombre,
-        telefono=proveedor_in.telefono,
-        email=proveedor_in.email,
-        direccion_id=direccion_obj.id if direccion_obj else proveedor_in.direccion_id
-    )
-    db.add(proveedor)
+def _aplicar_kilometrajes(db: Session, ultimas: dict) -> dict:
+    # Devuelve {patente: (id, kilometraje)} de los vehículos que avanzaron; nunca retrocede el odómetro
+    V = models.Vehiculo
+    if db.get_bind().dialect.name == "postgresql":
+        # Una sola sentencia: UPDATE ... FROM (VALUES ...) RETURNING
+        lecturas = values(column("patente", String), column("kilometraje", Integer), name="lecturas").data(
+            list(ultimas.items())
+        )
+        stmt = (
+            update(V)
+            .where(V.patente == lecturas.c.patente, or_(V.kilometraje.is_(None), V.kilometraje < lecturas.c.kilometraje))
+            .values(kilometraje=lecturas.c.kilometraje)
+            .returning(V.patente, V.id, V.kilometraje)
+        )
+        return {patente: (id, km) for patente, id, km in db.execute(stmt)}
+
+    # SQLite (pruebas locales) no admite FROM (VALUES ...) con nombres de columna
+    actuales = {p: (id, km) for p, id, km in db.query(V.patente, V.id, V.kilometraje).filter(V.patente.in_(list(ultimas)))}
+    avanzan = {
+        p: (actuales[p][0], km) for p, km in ultimas.items()
+        if p in actuales and (actuales[p][1] is None or actuales[p][1] < km)
+    }
+    if avanzan:
+        tabla = V.__table__
+        db.connection().execute(
+            update(tabla).where(tabla.c.patente == bindparam("p")).values(kilometraje=bindparam("km")),
+            [{"p": p, "km": km} for p, (_, km) in avanzan.items()],
+        )
+    return avanzan
+
+def actualizar_kilometrajes(
+    db: Session, lecturas: List[schemas.LecturaKilometraje], clave: Optional[str] = None
+) -> Tuple[List[dict], bool]:
+    # Devuelve (resultados, repetida); repetida indica una respuesta guardada por Idempotency-Key
+    if len(lecturas) > MAXIMO_LECTURAS:
+        raise ValueError(f"Se aceptan hasta {MAXIMO_LECTURAS} lecturas por solicitud")
+    huella = huella_idempotencia([l.model_dump(mode="json") for l in lecturas])
+    if clave:
+        previa = leer_idempotencia(db, ENDPOINT_KILOMETRAJE, clave, huella)
+        if previa is not None:
+            return previa, True
+
+    # Con varias lecturas de una patente en el lote vale la mayor, aunque no sea la de ts más reciente:
+    # el odómetro solo avanza
+    ultimas = {}
+    for lectura in lecturas:
+        ultimas[lectura.patente] = max(ultimas.get(lectura.patente, lectura.kilometraje), lectura.kilometraje)
+
+    actualizados = _aplicar_kilometrajes(db, ultimas)
+    resto = [p for p in ultimas if p not in actualizados]
+    actuales = dict(
+        db.query(models.Vehiculo.patente, models.Vehiculo.kilometraje).filter(models.Vehiculo.patente.in_(resto))
+    ) if resto else {}
+
+    resultados = []
+    for patente in ultimas:
+        if patente in actualizados:
+            resultados.append({"patente": patente, "estado": "actualizado", "kilometraje": actualizados[patente][1]})
+        elif patente in actuales:
+            resultados.append({"patente": patente, "estado": "sin_cambio", "kilometraje": actuales[patente]})
+        else:
+            resultados.append({"patente": patente, "estado": "no_encontrado", "kilometraje": None})
+
+    for id, km in actualizados.values():
+        eventos.publicar(db, "vehiculo", "actualizar", id, {"kilometraje": km})
+    if clave and not guardar_idempotencia(db, ENDPOINT_KILOMETRAJE, clave, huella, resultados):
+        # Un reintento concurrente con la misma clave terminó primero: se descarta este lote
+        db.rollback()
+        return leer_idempotencia(db, ENDPOINT_KILOMETRAJE, clave, huella), True
     db.commit()
-    db.refresh(proveedor)
-    return proveedor
+    return resultados, False
 
-def actualizar_proveedor(db: Session, id: int, proveedor_in: schemas.ProveedorUpdate) -> Optional[models.Proveedor]:
-    proveedor = db.query(models.Proveedor).filter(models.Proveedor.id == id).first()
-    if not proveedor:
+# --- IDEMPOTENCIA ---
+
+IDEMPOTENCIA_TTL = timedelta(hours=app_config.idempotencia_ttl_h)
+
+def huella_idempotencia(cuerpo) -> str:
+    return hashlib.sha256(json.dumps(cuerpo, sort_keys=True, default=str).encode()).hexdigest()
+
+def leer_idempotencia(db: Session, endpoint: str, clave: str, huella: str) -> Optional[list]:
+    # El vencimiento se compara en SQL: SQLite devuelve las fechas sin zona horaria
+    C = models.ClaveIdempotencia
+    vigente = C.creado >= datetime.now(timezone.utc) - IDEMPOTENCIA_TTL
+    guardada = db.scalars(select(C).where(C.endpoint == endpoint, C.clave == clave, vigente)).first()
+    if guardada is None:
         return None
+    if guardada.huella != huella:
+        raise ValueError("La Idempotency-Key ya se usó con un cuerpo distinto")
+    return json.loads(guardada.respuesta)
+
+def guardar_idempotencia(db: Session, endpoint: str, clave: str, huella: str, respuesta) -> bool:
+    # Se guarda en la misma transacción que los cambios; False si la clave ya estaba tomada
+    C = models.ClaveIdempotencia
+    ahora = datetime.now(timezone.utc)
+    db.execute(delete(C).where(C.creado < ahora - IDEMPOTENCIA_TTL))
+    dialecto = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    stmt = dialecto.insert(C).values(
+        endpoint=endpoint, clave=clave, huella=huella, respuesta=json.dumps(respuesta, default=str), creado=ahora
+    ).on_conflict_do_nothing(index_elements=[C.endpoint, C.clave])
+    return db.execute(stmt).rowcount == 1
 
-    if proveedor_in.nombre != proveedor.nombre:
-        exists = db.query(models.Proveedor).filter(
-            models.Proveedor.nombre == proveedor_in.nombre,
-            models.Proveedor.id != id
-        ).first()
-        if exists:
-            raise ValueError("Proveedor con ese nombre ya existe")
+# --- PROVEEDORES ---
 
-    proveedor.nombre = proveedor_in.nombre
-    proveedor.telefono = proveedor_in.telefono
-    proveedor.email = proveedor_in.email
+# Proveedores, direcciones y tipos cambian poco: sus listados pasan por app.cache y las
+# escrituras de proveedores invalidan ambos prefijos
+def obtener_proveedores(db: Session, cursor: Optional[str] = None, limite: Optional[int] = None, campos: Optional[str] = None) -> EntradaCache:
+    def cargar():
+        return paginar(
+            db, models.Proveedor, [models.Proveedor.id], cursor, limite, campos, serializador=FILAS["proveedores"]
+        )
+    return cache.leer("proveedores", f"{cursor}:{limite}:{campos}", cargar)
 
+def _valores_proveedor(db: Session, proveedor_in: schemas.ProveedorCreate) -> dict:
+    valores = {"nombre": proveedor_in.nombre, "telefono": proveedor_in.telefono, "email": proveedor_in.email}
     if proveedor_in.direccion_nueva:
-        direccion_obj = models.Direccion(**proveedor_in.direccion_nueva.model_dump())
-        db.add(direccion_obj)
-        db.flush()
-        proveedor.direccion_id = direccion_obj.id
+        # La dirección devuelta queda en la sesión: proveedor.direccion se resuelve sin otra consulta
+        direccion = _insertar(db, models.Direccion, proveedor_in.direccion_nueva.model_dump(), "Dirección duplicada")
+        eventos.publicar(db, "direccion", "crear", direccion.id, _columnas(direccion))
+        valores["direccion_id"] = direccion.id
     elif proveedor_in.direccion_id is not None:
-        proveedor.direccion_id = proveedor_in.direccion_id
+        valores["direccion_id"] = proveedor_in.direccion_id
+    return valores
+
+def crear_proveedor(db: Session, proveedor_in: schemas.ProveedorCreate) -> models.Proveedor:
+    proveedor = _insertar(db, models.Proveedor, _valores_proveedor(db, proveedor_in), "Proveedor ya existe")
+    eventos.publicar(db, "proveedor", "crear", proveedor.id, _columnas(proveedor))
+    db.commit()
+    cache.invalidar("proveedores", "direcciones")
+    return proveedor
 
+def actualizar_proveedor(db: Session, id: int, proveedor_in: schemas.ProveedorUpdate) -> Optional[models.Proveedor]:
+    anterior = _valores_anteriores(db, models.Proveedor, id, ("nombre", "telefono", "email", "direccion_id"))
+    if anterior is None:
+        db.rollback()
+        return None
+    valores = _valores_proveedor(db, proveedor_in)
+    proveedor = _actualizar(db, models.Proveedor, id, valores, "Proveedor con ese nombre ya existe")
+    _publicar_cambios(db, "proveedor", id, anterior, valores)
     db.commit()
-    db.refresh(proveedor)
+    cache.invalidar("proveedores", "direcciones")
     return proveedor
 
 def delete_proveedor(db: Session, id: int) -> bool:
-    proveedor = db.query(models.Proveedor).options(joinedload(models.Proveedor.mantenciones)).filter(models.Proveedor.id == id).first()
+    proveedor = db.query(models.Proveedor).filter(models.Proveedor.id == id).first()
     if not proveedor:
         return False
-    if proveedor.mantenciones and len(proveedor.mantenciones) > 0:
+    # Basta saber si existe alguna mantención: no se cargan todas en memoria
+    if db.query(exists().where(models.Mantencion.proveedor_id == id)).scalar():
         return False
     db.delete(proveedor)
+    eventos.publicar(db, "proveedor", "eliminar", id)
     db.commit()
+    cache.invalidar("proveedores")
     return True
 
+# --- IMPORTACIÓN MASIVA ---
+
+def _insertar_lote(
+    db: Session,
+    modelo,
+    lote: List[Tuple[int, dict]],
+    al_insertar: Optional[Callable[[Session, List[dict]], None]] = None
+) -> Tuple[int, List[schemas.ErrorImportacion]]:
+    if not lote:
+        return 0, []
+    try:
+        # Un solo INSERT multi-fila y una transacción por lote
+        db.execute(insert(modelo), [valores for _, valores in lote])
+        if al_insertar:
+            al_insertar(db, [valores for _, valores in lote])
+        db.commit()
+        return len(lote), []
+    except IntegrityError:
+        db.rollback()
+
+    # Alguna fila viola una restricción: se reintenta fila por fila para reportar solo esas
+    errores, insertados = [], []
+    for fila, valores in lote:
+        try:
+            with db.begin_nested():
+                db.execute(insert(modelo), [valores])
+            insertados.append(valores)
+        except IntegrityError as e:
+            errores.append(schemas.ErrorImportacion(fila=fila, error=str(e.orig).strip()))
+    if al_insertar and insertados:
+        al_insertar(db, insertados)
+    db.commit()
+    return len(lote) - len(errores), errores
+
+# --- DIRECCIONES ---
+
+def obtener_direcciones(db: Session, cursor: Optional[str] = None, limite: Optional[int] = None, campos: Optional[str] = None) -> EntradaCache:
+    def cargar():
+        return paginar(
+            db, models.Direccion, [models.Direccion.id], cursor, limite, campos, serializador=FILAS["direcciones"]
+        )
+    return cache.leer("direcciones", f"{cursor}:{limite}:{campos}", cargar)
+
 # --- MANTENCIONES ---
 
+def obtener_ultimo_kilometraje(db: Session, vehiculo_id: int) -> Optional[int]:
+    # Resuelto con ix_mantenciones_vehiculo_kilometraje: lee una sola entrada del índice
+    return (
+        db.query(models.Mantencion.kilometraje)
+        .filter(models.Mantencion.vehiculo_id == vehiculo_id, models.Mantencion.kilometraje.isnot(None))
+        .order_by(models.Mantencion.kilometraje.desc())
+        .limit(1)
+        .scalar()
+    )
+
+def _avanzar_kilometraje_vehiculo(db: Session, vehiculo_id: int, kilometraje: Optional[int]):
+    # Vehiculo.kilometraje guarda el odómetro más alto conocido; nunca retrocede
+    if kilometraje is None:
+        return
+    V = models.Vehiculo
+    avanzo = db.execute(
+        update(V)
+        .where(V.id == vehiculo_id, or_(V.kilometraje.is_(None), V.kilometraje < kilometraje))
+        .values(kilometraje=kilometraje)
+        .returning(V.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if avanzo is not None:
+        eventos.publicar(db, "vehiculo", "actualizar", vehiculo_id, {"kilometraje": kilometraje})
+
 def crear_mantencion(db: Session, mantencion: schemas.MantencionCreate) -> models.Mantencion:
-    db_mantencion = models.Mantencion(**mantencion.dict())
-    db.add(db_mantencion)
+    # INSERT ... SELECT ... WHERE NOT EXISTS: la regla de kilometraje va en la misma sentencia y
+    # el último kilometraje solo se consulta para el mensaje de error
+    M, valores = models.Mantencion, mantencion.dict()
+    fila = select(*[literal(valor, type_=getattr(M, campo).type) for campo, valor in valores.items()])
+    if mantencion.kilometraje is not None:
+        fila = fila.where(~exists().where(M.vehiculo_id == mantencion.vehiculo_id, M.kilometraje > mantencion.kilometraje))
+    try:
+        db_mantencion = db.scalars(insert(M).from_select(list(valores), fila).returning(M)).one_or_none()
+    except IntegrityError as e:
+        raise _error_integridad(db, e, "La mantención ya existe.")
+    if db_mantencion is None:
+        ultimo_km = obtener_ultimo_kilometraje(db, mantencion.vehiculo_id)
+        db.rollback()
+        raise ValueError(f"El kilometraje debe ser mayor o igual al último registrado: {ultimo_km} km.")
+    _avanzar_kilometraje_vehiculo(db, mantencion.vehiculo_id, mantencion.kilometraje)
+    sumar_resumen_mensual(db, [valores])
+    recalcular_programaciones(db, [mantencion.vehiculo_id])
+    eventos.publicar(db, "mantencion", "crear", db_mantencion.id, _columnas(db_mantencion))
     db.commit()
-    db.refresh(db_mantencion)
     return db_mantencion
 
+# Las más recientes primero; el id desempata mantenciones del mismo día
+ORDEN_MANTENCIONES = [models.Mantencion.fecha, models.Mantencion.id]
+
+def filtros_mantenciones(fecha_desde: Optional[date] = None, fecha_hasta: Optional[date] = None) -> list:
+    filtros = []
+    if fecha_desde:
+        filtros.append(models.Mantencion.fecha >= fecha_desde)
+    if fecha_hasta:
+        filtros.append(models.Mantencion.fecha <= fecha_hasta)
+    return filtros
+
 def obtener_mantenciones(
     db: Session, 
     fecha_desde: Optional[date] = None, 
-    fecha_hasta: Optional[date] = None
-) -> List[models.Mantencion]:
-    query = db.query(models.Mantencion)
-    if fecha_desde:
-        query = query.filter(models.Mantencion.fecha >= fecha_desde)
-    if fecha_hasta:
-        query = query.filter(models.Mantencion.fecha <= fecha_hasta)
-    return query.all()
+    fecha_hasta: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limite: Optional[int] = None,
+    campos: Optional[str] = None
+):
+    return paginar(
+        db, models.Mantencion, ORDEN_MANTENCIONES, cursor, limite, campos,
+        filtros=filtros_mantenciones(fecha_desde, fecha_hasta), descendente=True, serializador=FILAS["mantenciones"]
+    )
+
+def _mantenciones_importadas(db: Session, mantenciones: List[dict]):
+    maximos = {}
+    for m in mantenciones:
+        if m["kilometraje"] is not None:
+            maximos[m["vehiculo_id"]] = max(maximos.get(m["vehiculo_id"], m["kilometraje"]), m["kilometraje"])
+    for vehiculo_id, kilometraje in maximos.items():
+        _avanzar_kilometraje_vehiculo(db, vehiculo_id, kilometraje)
+    sumar_resumen_mensual(db, mantenciones)
+    recalcular_programaciones(db, {m["vehiculo_id"] for m in mantenciones})
+    eventos.publicar(db, "mantencion", "recargar")
+
+def importar_mantenciones_lote(db: Session, lote: List[Tuple[int, dict]]) -> Tuple[int, List[schemas.ErrorImportacion]]:
+    # La misma regla que crear_mantencion: el kilometraje no retrocede respecto de lo ya registrado
+    # ni de las filas anteriores del archivo para el mismo vehículo
+    M = models.Mantencion
+    ultimos = dict(
+        db.query(M.vehiculo_id, func.max(M.kilometraje))
+        .filter(M.vehiculo_id.in_({valores["vehiculo_id"] for _, valores in lote}))
+        .group_by(M.vehiculo_id)
+    )
+    errores, validos = [], []
+    for fila, valores in lote:
+        vehiculo_id, kilometraje = valores["vehiculo_id"], valores["kilometraje"]
+        ultimo_km = ultimos.get(vehiculo_id)
+        if kilometraje is not None and ultimo_km is not None and kilometraje < ultimo_km:
+            errores.append(schemas.ErrorImportacion(
+                fila=fila, error=f"El kilometraje debe ser mayor o igual al último registrado: {ultimo_km} km."
+            ))
+            continue
+        if kilometraje is not None:
+            ultimos[vehiculo_id] = max(kilometraje, ultimo_km or kilometraje)
+        validos.append((fila, valores))
+    insertados, errores_insercion = _insertar_lote(db, M, validos, _mantenciones_importadas)
+    return insertados, errores + errores_insercion
 
 def get_mantencion(db: Session, id: int) -> Optional[models.Mantencion]:
     return db.query(models.Mantencion).filter(models.Mantencion.id == id).first()
 
-def obtener_tipos_mantencion(db: Session):
-    return db.query(models.TipoMantencion).all()
+def obtener_tipos_mantencion(db: Session) -> EntradaCache:
+    def cargar():
+        return [schemas.TipoMantencion.model_validate(t).model_dump() for t in db.query(models.TipoMantencion)]
+    return cache.leer("tipos_mantencion", "todos", cargar)
 
 def actualizar_mantencion(db: Session, id: int, datos: schemas.MantencionCreate) -> Optional[models.Mantencion]:
-    mantencion = get_mantencion(db, id)
+    # La fila anterior hace falta para el delta del rollup; se bloquea para que nadie la cambie entremedio
+    mantencion = db.get(models.Mantencion, id, with_for_update=True)
     if not mantencion:
         return None
+    # No permitir disminuir el kilometraje (para mantener orden lógico)
+    if mantencion.kilometraje is not None and datos.kilometraje < mantencion.kilometraje:
+        db.rollback()
+        raise ValueError(f"El kilometraje no puede ser menor al actual registrado: {mantencion.kilometraje} km.")
+    anterior = {c: getattr(mantencion, c) for c in ("vehiculo_id", "tipo_id", "proveedor_id", "fecha", "costo", "kilometraje")}
+    cambios = {c: v for c, v in datos.dict().items() if getattr(mantencion, c) != v}
     for key, value in datos.dict().items():
         setattr(mantencion, key, value)
+    _avanzar_kilometraje_vehiculo(db, datos.vehiculo_id, datos.kilometraje)
+    db.flush()
+    # El rollup recibe el delta: se resta la fila anterior y se suma la nueva
+    sumar_resumen_mensual(db, [anterior], signo=-1)
+    sumar_resumen_mensual(db, [datos.dict()])
+    recalcular_programaciones(db, {anterior["vehiculo_id"], datos.vehiculo_id})
+    if cambios:
+        eventos.publicar(db, "mantencion", "actualizar", id, cambios)
     db.commit()
-    db.refresh(mantencion)
     return mantencion
 
 
 # --- PROGRAMACIÓN MANTENCIONES ---
 
+def _sumar_meses(fecha: date, meses: int) -> date:
+    total = fecha.month - 1 + meses
+    anio, mes = fecha.year + total // 12, total % 12 + 1
+    return date(anio, mes, min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+def _estimar_siguiente(
+    ultima_fecha: Optional[date],
+    ultima_km: Optional[int],
+    frecuencia_km: Optional[int],
+    frecuencia_meses: Optional[int],
+    km_por_dia: Optional[float]
+) -> Tuple[Optional[date], Optional[int]]:
+    siguiente_km = ultima_km + frecuencia_km if ultima_km is not None and frecuencia_km else None
+
+    # Vence lo que ocurra primero: el plazo en meses o la fecha en que, al ritmo
+    # observado del vehículo, se recorren frecuencia_km
+    candidatas = []
+    if ultima_fecha and frecuencia_meses:
+        candidatas.append(_sumar_meses(ultima_fecha, frecuencia_meses))
+    if ultima_fecha and frecuencia_km and km_por_dia:
+        candidatas.append(ultima_fecha + timedelta(days=round(frecuencia_km / km_por_dia)))
+    return (min(candidatas) if candidatas else None), siguiente_km
+
+def _historial_vehiculos(db: Session, vehiculo_ids: Optional[List[int]] = None) -> Tuple[dict, dict]:
+    # Última mantención por (vehículo, tipo) y km recorridos por día de cada vehículo
+    M = models.Mantencion
+    ultimas = db.query(M.vehiculo_id, M.tipo_id, func.max(M.fecha), func.max(M.kilometraje))
+    ritmos = db.query(M.vehiculo_id, func.min(M.fecha), func.max(M.fecha), func.min(M.kilometraje), func.max(M.kilometraje))
+    if vehiculo_ids is not None:
+        ultimas = ultimas.filter(M.vehiculo_id.in_(vehiculo_ids))
+        ritmos = ritmos.filter(M.vehiculo_id.in_(vehiculo_ids))
+    ultima_por_tipo = {
+        (v, t): (fecha, km) for v, t, fecha, km in ultimas.group_by(M.vehiculo_id, M.tipo_id)
+    }
+    km_por_dia = {}
+    for v, desde, hasta, km_min, km_max in ritmos.group_by(M.vehiculo_id):
+        if desde and hasta and hasta > desde and km_min is not None and km_max > km_min:
+            km_por_dia[v] = (km_max - km_min) / (hasta - desde).days
+    return ultima_por_tipo, km_por_dia
+
+def _estimar_programacion(p: dict, ultima_por_tipo: dict, km_por_dia: dict) -> dict:
+    ultima_fecha, ultima_km = ultima_por_tipo.get(
+        (p["vehiculo_id"], p["tipo_id"]), (p["ultima_fecha"], p["ultima_kilometraje"])
+    )
+    siguiente_fecha, siguiente_km = _estimar_siguiente(
+        ultima_fecha, ultima_km, p["frecuencia_km"], p["frecuencia_meses"], km_por_dia.get(p["vehiculo_id"])
+    )
+    return {
+        "ultima_fecha": ultima_fecha,
+        "ultima_kilometraje": ultima_km,
+        "siguiente_fecha_estimada": siguiente_fecha or p["siguiente_fecha_estimada"],
+        "siguiente_kilometraje_estimado": siguiente_km if siguiente_km is not None else p["siguiente_kilometraje_estimado"],
+    }
+
+def recalcular_programaciones(db: Session, vehiculo_ids: Optional[Iterable[int]] = None) -> int:
+    # Tres consultas agregadas y un UPDATE por lote, sin importar cuántos vehículos haya
+    P = models.ProgramarMantencion
+    progs = db.query(
+        P.id, P.vehiculo_id, P.tipo_id, P.frecuencia_km, P.frecuencia_meses, P.ultima_fecha,
+        P.ultima_kilometraje, P.siguiente_fecha_estimada, P.siguiente_kilometraje_estimado
+    )
+    if vehiculo_ids is not None:
+        vehiculo_ids = list(vehiculo_ids)
+        progs = progs.filter(P.vehiculo_id.in_(vehiculo_ids))
+
+    progs = progs.all()
+    if not progs:
+        return 0
+    ultima_por_tipo, km_por_dia = _historial_vehiculos(db, vehiculo_ids)
+
+    cambios = []
+    for p in progs:
+        p = p._asdict()
+        nuevo = _estimar_programacion(p, ultima_por_tipo, km_por_dia)
+        distintos = {campo: valor for campo, valor in nuevo.items() if p[campo] != valor}
+        if distintos:
+            cambios.append({"id": p["id"], **nuevo})
+            eventos.publicar(db, "programacion", "actualizar", p["id"], distintos)
+
+    if cambios:
+        db.execute(update(P), cambios)
+    return len(cambios)
+
+def obtener_programaciones_proximas(
+    db: Session,
+    dias: Optional[int] = None,
+    km: Optional[int] = None,
+    limite: int = 100
+) -> List[schemas.ProgramacionProxima]:
+    P, V = models.ProgramarMantencion, models.Vehiculo
+    hoy = date.today()
+    km_restantes = (P.siguiente_kilometraje_estimado - V.kilometraje).label("km_restantes")
+    vencida_fecha = and_(P.siguiente_fecha_estimada.isnot(None), P.siguiente_fecha_estimada < hoy)
+    vencida_km = and_(km_restantes.isnot(None), km_restantes <= 0)
+
+    # Sin parámetros solo se listan las vencidas; las vencidas por fecha o por km entran siempre
+    condiciones = [
+        P.siguiente_fecha_estimada <= hoy + timedelta(days=dias or 0),
+        km_restantes <= (km or 0),
+    ]
+
+    filas = (
+        db.query(
+            P.id, P.vehiculo_id, V.patente, P.tipo_id, models.TipoMantencion.nombre.label("tipoMantencion"),
+            P.siguiente_fecha_estimada, P.siguiente_kilometraje_estimado,
+            V.kilometraje.label("kilometraje_actual"), km_restantes,
+        )
+        .join(V, P.vehiculo_id == V.id)
+        .join(models.TipoMantencion, P.tipo_id == models.TipoMantencion.id)
+        .filter(or_(*condiciones))
+        .order_by(
+            case((or_(vencida_fecha, vencida_km), 0), else_=1),
+            P.siguiente_fecha_estimada.asc().nulls_last(),
+            km_restantes.asc().nulls_last(),
+        )
+        .limit(limite)
+        .all()
+    )
+    return [
+        schemas.ProgramacionProxima(**f._asdict(), **_vencimiento(f.siguiente_fecha_estimada, f.km_restantes, hoy))
+        for f in filas
+    ]
+
+def _vencimiento(siguiente_fecha: Optional[date], km_restantes: Optional[int], hoy: date) -> dict:
+    return {
+        "dias_restantes": (siguiente_fecha - hoy).days if siguiente_fecha else None,
+        "vencida": bool((siguiente_fecha and siguiente_fecha < hoy) or (km_restantes is not None and km_restantes <= 0)),
+    }
+
+def _valores_programacion(db: Session, programacion: schemas.ProgramarMantencionCreate) -> dict:
+    # Las estimaciones se calculan antes de escribir: una programación no afecta a las demás del
+    # vehículo, así que basta con la fila propia y no hace falta recalcular después
+    valores = programacion.dict()
+    valores.update(_estimar_programacion(valores, *_historial_vehiculos(db, [programacion.vehiculo_id])))
+    return valores
+
 def crear_programacion(db: Session, programacion: schemas.ProgramarMantencionCreate) -> models.ProgramarMantencion:
-    db_prog = models.ProgramarMantencion(**programacion.dict())
-    db.add(db_prog)
+    db_prog = _insertar(db, models.ProgramarMantencion, _valores_programacion(db, programacion), "La programación ya existe.")
+    eventos.publicar(db, "programacion", "crear", db_prog.id, _columnas(db_prog))
     db.commit()
-    db.refresh(db_prog)
     return db_prog
 
-def obtener_programaciones(db: Session) -> List[models.ProgramarMantencion]:
-    return db.query(models.ProgramarMantencion).all()
+def obtener_programaciones(db: Session, cursor: Optional[str] = None, limite: Optional[int] = None, campos: Optional[str] = None):
+    return paginar(
+        db, models.ProgramarMantencion, [models.ProgramarMantencion.id], cursor, limite, campos,
+        serializador=FILAS["programaciones"]
+    )
 
 def get_programacion(db: Session, id: int) -> Optional[models.ProgramarMantencion]:
     return db.query(models.ProgramarMantencion).filter(models.ProgramarMantencion.id == id).first()
 
 def actualizar_programacion(db: Session, id: int, datos: schemas.ProgramarMantencionCreate) -> Optional[models.ProgramarMantencion]:
-    prog = get_programacion(db, id)
-    if not prog:
+    valores = _valores_programacion(db, datos)
+    anterior = _valores_anteriores(db, models.ProgramarMantencion, id, valores)
+    if anterior is None:
+        db.rollback()
         return None
-    for key, value in datos.dict().items():
-        setattr(prog, key, value)
+    prog = _actualizar(db, models.ProgramarMantencion, id, valores, "La programación ya existe.")
+    _publicar_cambios(db, "programacion", id, anterior, valores)
     db.commit()
-    db.refresh(prog)
     return prog
 
 def eliminar_programacion(db: Session, id: int) -> bool:
@@ -173,20 +727,140 @@ def eliminar_programacion(db: Session, id: int) -> bool:
     if not prog:
         return False
     db.delete(prog)
+    eventos.publicar(db, "programacion", "eliminar", id)
     db.commit()
     return True
 
+# --- RESUMEN MENSUAL DE COSTOS ---
+
+USAR_RESUMEN_MENSUAL = app_config.reportes_resumen_mensual
+
+def _inicio_mes(fecha: date) -> date:
+    return fecha.replace(day=1)
+
+def _clave_resumen(m: dict) -> tuple:
+    return (_inicio_mes(m["fecha"]), m["vehiculo_id"] or 0, m["tipo_id"] or 0, m["proveedor_id"] or 0)
+
+def sumar_resumen_mensual(db: Session, mantenciones: List[dict], signo: int = 1):
+    R = models.ResumenMensualCosto
+    deltas = {}
+    for m in mantenciones:
+        clave = _clave_resumen(m)
+        costo, cantidad, km = deltas.get(clave, (0, 0, None))
+        km_fila = m["kilometraje"] if signo > 0 else None
+        if km is None or (km_fila is not None and km_fila > km):
+            km = km_fila
+        deltas[clave] = (costo + signo * int(m["costo"] or 0), cantidad + signo, km)
+    if not deltas:
+        return
+
+    # Un solo INSERT ... ON CONFLICT DO UPDATE para todas las claves del lote
+    dialecto = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    stmt = dialecto.insert(R).values([
+        {"mes": mes, "vehiculo_id": v, "tipo_id": t, "proveedor_id": p,
+         "costo_total": costo, "cantidad": cantidad, "kilometraje_max": km}
+        for (mes, v, t, p), (costo, cantidad, km) in deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[R.mes, R.vehiculo_id, R.tipo_id, R.proveedor_id],
+        set_={
+            "costo_total": R.costo_total + stmt.excluded.costo_total,
+            "cantidad": R.cantidad + stmt.excluded.cantidad,
+            "kilometraje_max": case(
+                (or_(R.kilometraje_max.is_(None), stmt.excluded.kilometraje_max > R.kilometraje_max),
+                 stmt.excluded.kilometraje_max),
+                else_=R.kilometraje_max,
+            ),
+        },
+    )
+    db.execute(stmt)
+
+    if signo < 0:
+        # Un máximo no se puede restar: se recalcula desde mantenciones para las claves afectadas
+        M = models.Mantencion
+        for mes, v, t, p in deltas:
+            km_max = (
+                select(func.max(M.kilometraje))
+                .where(
+                    func.coalesce(M.vehiculo_id, 0) == v, func.coalesce(M.tipo_id, 0) == t,
+                    func.coalesce(M.proveedor_id, 0) == p,
+                    M.fecha >= mes, M.fecha < _sumar_meses(mes, 1),
+                )
+                .scalar_subquery()
+            )
+            db.execute(
+                update(R)
+                .where(R.mes == mes, R.vehiculo_id == v, R.tipo_id == t, R.proveedor_id == p)
+                .values(kilometraje_max=km_max)
+            )
+        # Solo las claves de este llamado, que la PK resuelve sin recorrer todo el rollup
+        claves = tuple_(R.mes, R.vehiculo_id, R.tipo_id, R.proveedor_id)
+        db.execute(delete(R).where(claves.in_(list(deltas)), R.cantidad <= 0))
+
+def _expresion_inicio_mes(db: Session):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(models.Mantencion.fecha, literal_column("'start of month'"))
+    return cast(func.date_trunc(literal_column("'month'"), models.Mantencion.fecha), Date)
+
+def reconstruir_resumen_mensual(db: Session) -> int:
+    R, M = models.ResumenMensualCosto, models.Mantencion
+    mes = _expresion_inicio_mes(db)
+    claves = [mes, func.coalesce(M.vehiculo_id, 0), func.coalesce(M.tipo_id, 0), func.coalesce(M.proveedor_id, 0)]
+    db.execute(delete(R))
+    db.execute(
+        insert(R).from_select(
+            [R.mes, R.vehiculo_id, R.tipo_id, R.proveedor_id, R.costo_total, R.cantidad, R.kilometraje_max],
+            select(*claves, func.coalesce(func.sum(M.costo), 0), func.count(M.id), func.max(M.kilometraje))
+            .group_by(*claves)
+        )
+    )
+    db.commit()
+    return db.query(func.count()).select_from(R).scalar()
+
+def _resumen_cubre(fecha_desde: Optional[date], fecha_hasta: Optional[date]) -> bool:
+    # El rollup solo responde rangos que empiezan y terminan en borde de mes
+    if not USAR_RESUMEN_MENSUAL:
+        return False
+    if fecha_desde and fecha_desde.day != 1:
+        return False
+    if fecha_hasta and (fecha_hasta + timedelta(days=1)).day != 1:
+        return False
+    return True
+
+# --- PARTICIONES ---
+
+def asegurar_particiones_mantenciones(db: Session, anios_adelante: int = 1) -> List[int]:
+    # Postgres: crea las particiones anuales del año en curso y de los siguientes, y las de los años
+    # que hayan quedado en mantenciones_default (p. ej. una importación histórica), que así salen de
+    # ella y vuelven a podarse por fecha. No hace nada si la base no está migrada
+    if db.get_bind().dialect.name != "postgresql":
+        return []
+    existe = db.execute(select(func.to_regprocedure("crear_particion_mantenciones(integer)"))).scalar()
+    if existe is None:
+        return []
+    anio = date.today().year
+    por_defecto = table("mantenciones_default", column("fecha"))
+    anios = set(range(anio, anio + anios_adelante + 1))
+    anios.update(db.execute(select(cast(func.extract("year", por_defecto.c.fecha), Integer)).distinct()).scalars())
+    creadas = [a for a in sorted(anios) if db.execute(select(func.crear_particion_mantenciones(a))).scalar()]
+    db.commit()
+    return creadas
+
 # --- REPORTES DE MANTENCIONES ---
 
-def generar_reporte_mantenciones(
-    db: Session,
+# Literales en el SQL para que SELECT y GROUP BY usen exactamente la misma expresión
+SIN_PROVEEDOR = literal_column("'Sin proveedor'")
+
+def _filtrar_reporte(
+    query,
     fecha_desde: Optional[date] = None,
     fecha_hasta: Optional[date] = None,
     patente: Optional[str] = None,
     tipo_mantencion: Optional[str] = None,
     proveedor: Optional[str] = None
-) -> List[schemas.MantencionReporte]:
-    query = db.query(models.Mantencion).join(models.Vehiculo).join(models.TipoMantencion).join(models.Proveedor)
+):
+    # El proveedor es opcional: outer join para no perder esas mantenciones ("Sin proveedor")
+    query = query.join(models.Vehiculo).join(models.TipoMantencion).outerjoin(models.Proveedor)
 
     if fecha_desde:
         query = query.filter(models.Mantencion.fecha >= fecha_desde)
@@ -198,19 +872,274 @@ def generar_reporte_mantenciones(
         query = query.filter(models.TipoMantencion.nombre == tipo_mantencion)
     if proveedor:
         query = query.filter(models.Proveedor.nombre == proveedor)
+    return query
+
+def _filtrar_resumen(
+    query,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    patente: Optional[str] = None,
+    tipo_mantencion: Optional[str] = None,
+    proveedor: Optional[str] = None
+):
+    R = models.ResumenMensualCosto
+    query = (
+        query.join(models.Vehiculo, R.vehiculo_id == models.Vehiculo.id)
+        .join(models.TipoMantencion, R.tipo_id == models.TipoMantencion.id)
+        .outerjoin(models.Proveedor, R.proveedor_id == models.Proveedor.id)
+    )
+
+    if fecha_desde:
+        query = query.filter(R.mes >= fecha_desde)
+    if fecha_hasta:
+        query = query.filter(R.mes <= fecha_hasta)
+    if patente:
+        query = query.filter(models.Vehiculo.patente == patente)
+    if tipo_mantencion:
+        query = query.filter(models.TipoMantencion.nombre == tipo_mantencion)
+    if proveedor:
+        query = query.filter(models.Proveedor.nombre == proveedor)
+    return query
+
+def _expresion_mes(db: Session, columna=models.Mantencion.fecha):
+    # Postgres en producción; SQLite solo en pruebas locales
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime(literal_column("'%Y-%m'"), columna)
+    return func.to_char(columna, literal_column("'YYYY-MM'"))
+
+def _consulta_reporte(
+    db: Session,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    patente: Optional[str] = None,
+    tipo_mantencion: Optional[str] = None,
+    proveedor: Optional[str] = None
+):
+    # Solo se seleccionan las columnas del reporte: sin entidades ORM ni un schema por fila
+    query = db.query(
+        models.Mantencion.id.label("id"),
+        models.Vehiculo.patente.label("vehiculoPatente"),
+        models.TipoMantencion.nombre.label("tipoMantencion"),
+        func.coalesce(models.Proveedor.nombre, SIN_PROVEEDOR).label("proveedor"),
+        models.Mantencion.fecha.label("fecha"),
+        func.coalesce(models.Mantencion.costo, 0).label("costo"),
+    ).select_from(models.Mantencion)
+    query = _filtrar_reporte(query, fecha_desde, fecha_hasta, patente, tipo_mantencion, proveedor)
+    return query.order_by(models.Mantencion.id)
+
+def generar_reporte_mantenciones(
+    db: Session,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    patente: Optional[str] = None,
+    tipo_mantencion: Optional[str] = None,
+    proveedor: Optional[str] = None
+) -> List[Row]:
+    return _consulta_reporte(db, fecha_desde, fecha_hasta, patente, tipo_mantencion, proveedor).all()
+
+def iterar_reporte_mantenciones(
+    db: Session,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    patente: Optional[str] = None,
+    tipo_mantencion: Optional[str] = None,
+    proveedor: Optional[str] = None,
+    tamano_lote: int = 1000
+) -> Iterator[Row]:
+    # yield_per usa un cursor del lado del servidor: nunca se materializa el reporte completo
+    query = _consulta_reporte(db, fecha_desde, fecha_hasta, patente, tipo_mantencion, proveedor)
+    yield from query.yield_per(tamano_lote)
+
+def agregar_reporte_mantenciones(
+    db: Session,
+    agrupar_por: str,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    patente: Optional[str] = None,
+    tipo_mantencion: Optional[str] = None,
+    proveedor: Optional[str] = None
+) -> List[Row]:
+    if agrupar_por not in ("tipo", "proveedor", "vehiculo", "mes"):
+        raise ValueError(f"Agrupación no soportada: {agrupar_por}")
+
+    usar_resumen = _resumen_cubre(fecha_desde, fecha_hasta)
+    R, M = models.ResumenMensualCosto, models.Mantencion
+    claves = {
+        "tipo": models.TipoMantencion.nombre,
+        "proveedor": func.coalesce(models.Proveedor.nombre, SIN_PROVEEDOR),
+        "vehiculo": models.Vehiculo.patente,
+        "mes": _expresion_mes(db, R.mes if usar_resumen else M.fecha),
+    }
+    clave = claves[agrupar_por].label("clave")
 
-    resultados = query.all()
+    if usar_resumen:
+        costo_total = func.coalesce(func.sum(R.costo_total), 0).label("costo_total")
+        query = db.query(clave, costo_total, func.sum(R.cantidad).label("cantidad")).select_from(R)
+        query = _filtrar_resumen(query, fecha_desde, fecha_hasta, patente, tipo_mantencion, proveedor)
+    else:
+        costo_total = func.coalesce(func.sum(M.costo), 0).label("costo_total")
+        query = db.query(clave, costo_total, func.count(M.id).label("cantidad")).select_from(M)
+        query = _filtrar_reporte(query, fecha_desde, fecha_hasta, patente, tipo_mantencion, proveedor)
+    query = query.group_by(clave)
+    if agrupar_por == "mes":
+        return query.order_by(clave).all()
+    return query.order_by(costo_total.desc()).all()
 
-    reportes = []
-    for m in resultados:
-        reporte = schemas.MantencionReporte(
-            id=m.id,
-            vehiculoPatente=m.vehiculo.patente,
-            tipoMantencion=m.tipo.nombre,
-            proveedor=m.proveedor.nombre if m.proveedor else "Sin proveedor",
-            fecha=m.fecha,
-            costo=m.costo or 0
+# --- ANALÍTICA ---
+
+def _expresion_dias(db: Session):
+    # Días desde 1970-01-01: numpy recibe la fecha como número y no como objetos date
+    if db.get_bind().dialect.name == "sqlite":
+        return cast(func.julianday(models.Mantencion.fecha) - 2440587.5, Integer)
+    return models.Mantencion.fecha - literal(date(1970, 1, 1), Date)
+
+def datos_analitica(
+    db: Session,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    patente: Optional[str] = None,
+    tipo_mantencion: Optional[str] = None,
+    proveedor: Optional[str] = None
+) -> Tuple[List[Row], dict, dict]:
+    # Una sola consulta de columnas numéricas, en el orden de analitica.COLUMNAS. Los nombres salen
+    # de las tablas de vehículos y proveedores, que son chicas comparadas con mantenciones
+    M = models.Mantencion
+    query = db.query(
+        M.id, M.vehiculo_id, func.coalesce(M.proveedor_id, 0), M.tipo_id, _expresion_dias(db),
+        M.kilometraje, func.coalesce(M.costo, 0),
+    ).select_from(M)
+    query = _filtrar_reporte(query, fecha_desde, fecha_hasta, patente, tipo_mantencion, proveedor)
+    # El orden lo resuelve ix_mantenciones_vehiculo_fecha y numpy no tiene que ordenar
+    filas = query.order_by(M.vehiculo_id, M.fecha, M.kilometraje).all()
+    if not filas:
+        return filas, {}, {}
+    patentes = dict(db.query(models.Vehiculo.id, models.Vehiculo.patente))
+    proveedores = dict(db.query(models.Proveedor.id, models.Proveedor.nombre))
+    return filas, patentes, proveedores
+
+# --- BÚSQUEDA ---
+
+TIPOS_BUSQUEDA = ("vehiculo", "proveedor", "mantencion")
+# Mismas expresiones que models.INDICES_BUSQUEDA, para que Postgres use los índices GIN
+ESPACIO = literal_column("' '")
+CONFIG_TEXTO = literal_column("'spanish'")
+
+def _patron_like(q: str, prefijo: bool = False) -> str:
+    escapado = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escapado}%" if prefijo else f"%{escapado}%"
+
+def _consulta_tsquery(q: str) -> Optional[str]:
+    # Cada palabra como prefijo: "cambio ace" -> "cambio:* & ace:*"
+    palabras = re.findall(r"\w+", q.lower())
+    return " & ".join(f"{p}:*" for p in palabras) if palabras else None
+
+def _busqueda_postgres(db: Session, q: str, limite: int, tipos) -> list:
+    V, P, M = models.Vehiculo, models.Proveedor, models.Mantencion
+    consultas = []
+    if "vehiculo" in tipos:
+        marca_modelo = V.marca.concat(ESPACIO).concat(V.modelo).self_group()
+        puntaje = func.greatest(
+            case((V.patente.ilike(_patron_like(q, prefijo=True), escape="\\"), 1.0), else_=0.0),
+            func.similarity(V.patente, q),
+            func.word_similarity(q, marca_modelo),
         )
-        reportes.append(reporte)
+        consultas.append(
+            db.query(
+                literal_column("'vehiculo'").label("tipo"), V.id, V.patente.label("titulo"),
+                marca_modelo.label("detalle"), literal_column("NULL").label("fecha"), puntaje.label("puntaje"),
+            )
+            .filter(or_(
+                V.patente.ilike(_patron_like(q, prefijo=True), escape="\\"),
+                V.patente.op("%")(q),
+                marca_modelo.op("%>")(q),
+            ))
+        )
+    if "proveedor" in tipos:
+        puntaje = func.greatest(
+            case((P.nombre.ilike(_patron_like(q, prefijo=True), escape="\\"), 1.0), else_=0.0),
+            func.word_similarity(q, P.nombre),
+        )
+        consultas.append(
+            db.query(
+                literal_column("'proveedor'").label("tipo"), P.id, P.nombre.label("titulo"),
+                P.email.label("detalle"), literal_column("NULL").label("fecha"), puntaje.label("puntaje"),
+            )
+            .filter(or_(P.nombre.ilike(_patron_like(q), escape="\\"), P.nombre.op("%>")(q)))
+        )
+    tsquery = _consulta_tsquery(q)
+    if "mantencion" in tipos and tsquery:
+        documento = func.to_tsvector(CONFIG_TEXTO, func.coalesce(M.descripcion, literal_column("''")))
+        consulta_texto = func.to_tsquery(CONFIG_TEXTO, tsquery)
+        puntaje = func.greatest(func.ts_rank(documento, consulta_texto), func.word_similarity(q, M.descripcion))
+        consultas.append(
+            db.query(
+                literal_column("'mantencion'").label("tipo"), M.id,
+                func.concat_ws(literal_column("' · '"), models.Vehiculo.patente, models.TipoMantencion.nombre).label("titulo"),
+                M.descripcion.label("detalle"), M.fecha.label("fecha"), puntaje.label("puntaje"),
+            )
+            .outerjoin(models.Vehiculo, M.vehiculo_id == models.Vehiculo.id)
+            .outerjoin(models.TipoMantencion, M.tipo_id == models.TipoMantencion.id)
+            .filter(or_(documento.op("@@")(consulta_texto), M.descripcion.op("%>")(q)))
+        )
+    return [c.order_by(literal_column("puntaje").desc()).limit(limite).all() for c in consultas]
+
+def _busqueda_like(db: Session, q: str, limite: int, tipos) -> list:
+    # Alternativa para SQLite (pruebas locales): LIKE sin índices y un puntaje simple
+    V, P, M = models.Vehiculo, models.Proveedor, models.Mantencion
+    patron, prefijo = _patron_like(q.lower()), _patron_like(q.lower(), prefijo=True)
+
+    def puntaje(columna):
+        return case(
+            (func.lower(columna) == q.lower(), 1.0),
+            (func.lower(columna).like(prefijo, escape="\\"), 0.8),
+            else_=0.5,
+        )
+
+    consultas = []
+    if "vehiculo" in tipos:
+        marca_modelo = V.marca.concat(ESPACIO).concat(V.modelo)
+        consultas.append(
+            db.query(
+                literal_column("'vehiculo'").label("tipo"), V.id, V.patente.label("titulo"),
+                marca_modelo.label("detalle"), literal_column("NULL").label("fecha"), puntaje(V.patente).label("puntaje"),
+            )
+            .filter(or_(func.lower(V.patente).like(patron, escape="\\"), func.lower(marca_modelo).like(patron, escape="\\")))
+        )
+    if "proveedor" in tipos:
+        consultas.append(
+            db.query(
+                literal_column("'proveedor'").label("tipo"), P.id, P.nombre.label("titulo"),
+                P.email.label("detalle"), literal_column("NULL").label("fecha"), puntaje(P.nombre).label("puntaje"),
+            )
+            .filter(func.lower(P.nombre).like(patron, escape="\\"))
+        )
+    if "mantencion" in tipos:
+        consultas.append(
+            db.query(
+                literal_column("'mantencion'").label("tipo"), M.id,
+                (func.coalesce(models.Vehiculo.patente, "") + " · " + func.coalesce(models.TipoMantencion.nombre, "")).label("titulo"),
+                M.descripcion.label("detalle"), M.fecha.label("fecha"), literal_column("0.5").label("puntaje"),
+            )
+            .outerjoin(models.Vehiculo, M.vehiculo_id == models.Vehiculo.id)
+            .outerjoin(models.TipoMantencion, M.tipo_id == models.TipoMantencion.id)
+            .filter(func.lower(M.descripcion).like(patron, escape="\\"))
+        )
+    return [c.order_by(literal_column("puntaje").desc()).limit(limite).all() for c in consultas]
+
+def buscar(db: Session, q: str, limite: int = 20, tipos: Optional[Iterable[str]] = None) -> List[Row]:
+    q = q.strip()
+    if len(q) < 2:
+        raise ValueError("La búsqueda necesita al menos 2 caracteres")
+    tipos = set(tipos or TIPOS_BUSQUEDA)
+    desconocidos = tipos - set(TIPOS_BUSQUEDA)
+    if desconocidos:
+        raise ValueError(f"Tipos de búsqueda no soportados: {', '.join(sorted(desconocidos))}")
 
-    return reportes
+    # Cada entidad trae sus mejores resultados con su propio índice; el ranking final se arma aquí
+    if db.get_bind().dialect.name == "postgresql":
+        grupos = _busqueda_postgres(db, q, limite, tipos)
+    else:
+        grupos = _busqueda_like(db, q, limite, tipos)
+    resultados = [fila for grupo in grupos for fila in grupo]
+    resultados.sort(key=lambda fila: fila.puntaje, reverse=True)
+    return resultados[:limite]
@@ -0,0 +1,70 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+from app import models, schemas
+from app.cache import EntradaCache, cache
+from app.crud import FILAS, ORDEN_MANTENCIONES, filtros_mantenciones
+from app.paginacion import paginar_async
+
+# Versiones async de las lecturas de crud.py, usadas cuando db_async=true
+
+
+# --- VEHÍCULOS ---
+
+async def get_vehiculo_por_patente(db: AsyncSession, patente: str) -> Optional[models.Vehiculo]:
+    result = await db.execute(select(models.Vehiculo).where(models.Vehiculo.patente == patente))
+    return result.scalars().first()
+
+async def obtener_vehiculos(db: AsyncSession, cursor: Optional[str] = None, limite: Optional[int] = None, campos: Optional[str] = None):
+    return await paginar_async(db, models.Vehiculo, [models.Vehiculo.id], cursor, limite, campos, serializador=FILAS["vehiculos"])
+
+# --- PROVEEDORES ---
+
+async def obtener_proveedores(db: AsyncSession, cursor: Optional[str] = None, limite: Optional[int] = None, campos: Optional[str] = None) -> EntradaCache:
+    async def cargar():
+        return await paginar_async(
+            db, models.Proveedor, [models.Proveedor.id], cursor, limite, campos, serializador=FILAS["proveedores"]
+        )
+    return await cache.leer_async("proveedores", f"{cursor}:{limite}:{campos}", cargar)
+
+# --- DIRECCIONES ---
+
+async def obtener_direcciones(db: AsyncSession, cursor: Optional[str] = None, limite: Optional[int] = None, campos: Optional[str] = None) -> EntradaCache:
+    async def cargar():
+        return await paginar_async(
+            db, models.Direccion, [models.Direccion.id], cursor, limite, campos, serializador=FILAS["direcciones"]
+        )
+    return await cache.leer_async("direcciones", f"{cursor}:{limite}:{campos}", cargar)
+
+# --- MANTENCIONES ---
+
+async def obtener_mantenciones(
+    db: AsyncSession,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limite: Optional[int] = None,
+    campos: Optional[str] = None
+):
+    return await paginar_async(
+        db, models.Mantencion, ORDEN_MANTENCIONES, cursor, limite, campos,
+        filtros=filtros_mantenciones(fecha_desde, fecha_hasta), descendente=True, serializador=FILAS["mantenciones"]
+    )
+
+async def obtener_tipos_mantencion(db: AsyncSession) -> EntradaCache:
+    async def cargar():
+        result = await db.execute(select(models.TipoMantencion))
+        return [schemas.TipoMantencion.model_validate(t).model_dump() for t in result.scalars()]
+    return await cache.leer_async("tipos_mantencion", "todos", cargar)
+
+# --- PROGRAMACIÓN MANTENCIONES ---
+
+async def obtener_programaciones(db: AsyncSession, cursor: Optional[str] = None, limite: Optional[int] = None, campos: Optional[str] = None):
+    return await paginar_async(
+        db, models.ProgramarMantencion, [models.ProgramarMantencion.id], cursor, limite, campos,
+        serializador=FILAS["programaciones"]
+    )
+
+async def get_programacion(db: AsyncSession, id: int) -> Optional[models.ProgramarMantencion]:
+    return await db.get(models.ProgramarMantencion, id)
@@ -1,22 +1,192 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import os
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional
+from uuid import uuid4
+import time
+from app.config import db_config
 
-# Carga las variables desde .env
-load_dotenv()
+DATABASE_URL = db_config.url
+ASYNC_DATABASE_URL = db_config.url_async
 
-USER = os.getenv("user")
-PASSWORD = os.getenv("password")
-HOST = os.getenv("host")
-PORT = os.getenv("port")
-DBNAME = os.getenv("dbname")
+# db_async=true sirve las lecturas con asyncpg; el resto sigue usando la sesión síncrona
+DB_ASYNC = db_config.usar_async
 
-DATABASE_URL = f"postgresql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}"
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# --- MÉTRICAS DEL POOL ---
+
+_metricas_pool = {
+    "checkouts": 0,
+    "conexiones_creadas": 0,
+    "timeouts": 0,
+    "espera_total_s": 0.0,
+    "espera_max_s": 0.0,
+}
+_lock_metricas = Lock()
+
+def _registrar_espera(segundos: float, timeout: bool = False):
+    with _lock_metricas:
+        if timeout:
+            _metricas_pool["timeouts"] += 1
+            return
+        _metricas_pool["checkouts"] += 1
+        _metricas_pool["espera_total_s"] += segundos
+        _metricas_pool["espera_max_s"] = max(_metricas_pool["espera_max_s"], segundos)
+
+
+class _MedirEspera:
+    # _do_get es donde el pool bloquea esperando una conexión libre
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except Exception:
+            _registrar_espera(time.perf_counter() - inicio, timeout=True)
+            raise
+        espera = time.perf_counter() - inicio
+        _registrar_espera(espera)
+        _sumar_en_contadores("espera_pool_s", espera)
+        return conexion
+
+
+class PoolMedido(_MedirEspera, QueuePool):
+    pass
+
+
+class AsyncPoolMedido(_MedirEspera, AsyncAdaptedQueuePool):
+    pass
+
+
+# --- CONTADOR DE CONSULTAS ---
+
+# El contador vive en un ContextVar: cada request (o bloque de prueba) cuenta solo sus sentencias,
+# el tiempo que pasaron en la base y lo que esperó por una conexión del pool
+_contador_consultas: ContextVar[Optional[dict]] = ContextVar("contador_consultas", default=None)
+
+
+class DemasiadasConsultas(RuntimeError):
+    pass
+
+
+@contextmanager
+def contar_consultas(maximo: Optional[int] = None):
+    # Los contadores anidados también suman en el contador exterior
+    contador = {
+        "consultas": 0, "tiempo_db_s": 0.0, "espera_pool_s": 0.0,
+        "maximo": maximo, "padre": _contador_consultas.get(),
+    }
+    token = _contador_consultas.set(contador)
+    try:
+        yield contador
+    finally:
+        _contador_consultas.reset(token)
+
+def _contar_sentencia(conn, cursor, statement, parameters, context, executemany):
+    contador = _contador_consultas.get()
+    while contador is not None:
+        contador["consultas"] += 1
+        if contador["maximo"] and contador["consultas"] > contador["maximo"]:
+            raise DemasiadasConsultas(
+                f"Se superó el máximo de {contador['maximo']} consultas SQL: {statement.splitlines()[0][:200]}"
+            )
+        contador = contador["padre"]
+    # Una conexión ejecuta una sentencia a la vez: basta con guardar el inicio de la actual
+    conn.info["inicio_sentencia"] = time.perf_counter()
+
+def _medir_sentencia(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop("inicio_sentencia", None)
+    if inicio is not None:
+        _sumar_en_contadores("tiempo_db_s", time.perf_counter() - inicio)
+
+def _sumar_en_contadores(clave: str, valor: float):
+    contador = _contador_consultas.get()
+    while contador is not None:
+        contador[clave] += valor
+        contador = contador["padre"]
+
+
+def _opciones_pool() -> dict:
+    return {
+        "pool_size": db_config.pool_size,
+        "max_overflow": db_config.max_overflow,
+        "pool_timeout": db_config.pool_timeout,
+        "pool_recycle": db_config.pool_recycle,
+        "pool_pre_ping": db_config.pool_pre_ping,
+        "echo": db_config.echo,
+    }
+
+def _configurar_engine(sync_engine):
+    @event.listens_for(sync_engine, "connect")
+    def _al_conectar(dbapi_connection, connection_record):
+        with _lock_metricas:
+            _metricas_pool["conexiones_creadas"] += 1
+
+    event.listen(sync_engine, "before_cursor_execute", _contar_sentencia)
+    event.listen(sync_engine, "after_cursor_execute", _medir_sentencia)
+
+    if db_config.statement_timeout_ms and db_config.pgbouncer and sync_engine.dialect.name == "postgresql":
+        # En modo transacción un SET de sesión se filtraría a otros clientes del pooler;
+        # SET LOCAL solo dura lo que dura la transacción
+        @event.listens_for(sync_engine, "begin")
+        def _timeout_transaccion(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(db_config.statement_timeout_ms)}")
+
+
+def _connect_args_sync() -> dict:
+    if make_url(DATABASE_URL).get_backend_name() != "postgresql":
+        return {}
+    if db_config.statement_timeout_ms and not db_config.pgbouncer:
+        return {"options": f"-c statement_timeout={int(db_config.statement_timeout_ms)}"}
+    return {}
+
+def _connect_args_async() -> dict:
+    # Estos argumentos son de asyncpg; con database_url=sqlite:// el driver es aiosqlite
+    if make_url(ASYNC_DATABASE_URL).get_driver_name() != "asyncpg":
+        return {}
+    args = {}
+    if db_config.pgbouncer:
+        # pgbouncer en modo transacción no admite prepared statements con nombre reutilizados
+        args["statement_cache_size"] = 0
+        args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    if db_config.statement_timeout_ms and not db_config.pgbouncer:
+        args["server_settings"] = {"statement_timeout": str(int(db_config.statement_timeout_ms))}
+    return args
+
+
+engine = create_engine(DATABASE_URL, poolclass=PoolMedido, connect_args=_connect_args_sync(), **_opciones_pool())
+_configurar_engine(engine)
+# Sin expirar al confirmar, como la sesión async: lo que trajo RETURNING sigue sirviendo para la
+# respuesta y el commit no obliga a releer la fila
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, poolclass=AsyncPoolMedido, connect_args=_connect_args_async(), **_opciones_pool()
+    )
+    _configurar_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def estadisticas_pool() -> dict:
+    with _lock_metricas:
+        datos = dict(_metricas_pool)
+    datos["espera_promedio_s"] = datos["espera_total_s"] / datos["checkouts"] if datos["checkouts"] else 0.0
+    if isinstance(engine.pool, QueuePool):
+        datos["pool_size"] = engine.pool.size()
+        datos["en_uso"] = engine.pool.checkedout()
+        datos["disponibles"] = engine.pool.checkedin()
+        datos["overflow"] = engine.pool.overflow()
+    if async_engine is not None:
+        datos["async_en_uso"] = async_engine.pool.checkedout()
+    return datos
 
 Base = declarative_base()
 
@@ -26,3 +196,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
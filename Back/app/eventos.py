@@ -0,0 +1,198 @@
+import asyncio
+import itertools
+import select
+import threading
+import time
+from collections import deque
+from typing import Any, List, Optional, Tuple
+from uuid import uuid4
+import orjson
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.config import app_config
+from app.serializacion import _por_defecto
+
+# Feed de cambios de GET /eventos. Las escrituras de crud.py dejan sus eventos en la sesión y se
+# difunden solo si la transacción se confirma. Con un solo proceso basta el difusor en memoria;
+# con eventos_backend=postgres cada evento viaja por NOTIFY dentro de la misma transacción y un
+# hilo con LISTEN en cada worker lo recibe, así todos los workers ven el mismo feed en el mismo orden
+EVENTOS_BACKEND = app_config.eventos_backend
+# Eventos recientes que se guardan para retomar con Last-Event-ID
+EVENTOS_BUFFER = app_config.eventos_buffer
+# Un cliente que acumula más eventos sin leer se desconecta y retoma desde el buffer al reconectar
+EVENTOS_PENDIENTES_MAX = app_config.eventos_pendientes_max
+# LISTEN necesita una sesión propia: con pgbouncer en modo transacción usar la URL directa (5432)
+EVENTOS_URL = app_config.eventos_url
+CANAL = "fruselva_eventos"
+# NOTIFY acepta hasta 8000 bytes por mensaje
+MAXIMO_NOTIFY = 7900
+
+# Ids únicos entre procesos y reinicios: un Last-Event-ID de otra instancia no coincide con nada y
+# el cliente recibe "recargar"
+_INSTANCIA = uuid4().hex[:8]
+_contador = itertools.count(1)
+
+
+def nuevo_id() -> str:
+    return f"{_INSTANCIA}-{next(_contador)}"
+
+
+def publicar(db: Session, entidad: str, accion: str, id: Any = None, datos: Optional[dict] = None):
+    # accion: crear (datos = fila completa), actualizar (solo los campos que cambian), eliminar o
+    # recargar (cambios masivos: el cliente vuelve a pedir el listado)
+    evento = {"id": nuevo_id(), "entidad": entidad, "accion": accion}
+    if id is not None:
+        evento["clave"] = id
+    if datos is not None:
+        evento["datos"] = datos
+    db.info.setdefault("eventos", []).append(evento)
+
+
+class Difusor:
+    # Buffer circular de los últimos eventos y una cola asyncio por cliente conectado. entregar()
+    # se llama desde el hilo de la request o del LISTEN; las colas viven en el loop del servidor
+    def __init__(self, maximo: int):
+        self._buffer: deque = deque(maxlen=maximo)
+        self._suscriptores: set = set()
+        self._lock = threading.Lock()
+
+    def entregar(self, eventos: List[dict]):
+        with self._lock:
+            self._buffer.extend(eventos)
+            suscriptores = list(self._suscriptores)
+        for loop, cola in suscriptores:
+            loop.call_soon_threadsafe(_encolar, cola, eventos)
+
+    def suscribir(self, desde: Optional[str]) -> Tuple[tuple, Optional[List[dict]]]:
+        # Devuelve la suscripción y los eventos posteriores a desde. None si desde ya salió del
+        # buffer (o es de otra instancia): faltan eventos y el cliente tiene que recargar
+        suscripcion = (asyncio.get_running_loop(), asyncio.Queue(maxsize=EVENTOS_PENDIENTES_MAX))
+        with self._lock:
+            self._suscriptores.add(suscripcion)
+            if not desde:
+                return suscripcion, []
+            ids = [e["id"] for e in self._buffer]
+            if desde not in ids:
+                return suscripcion, None
+            return suscripcion, list(self._buffer)[ids.index(desde) + 1:]
+
+    def ultimo_id(self) -> str:
+        with self._lock:
+            return self._buffer[-1]["id"] if self._buffer else ""
+
+    def desuscribir(self, suscripcion: tuple):
+        with self._lock:
+            self._suscriptores.discard(suscripcion)
+
+    def conectados(self) -> int:
+        with self._lock:
+            return len(self._suscriptores)
+
+
+def _encolar(cola: asyncio.Queue, eventos: List[dict]):
+    try:
+        for evento in eventos:
+            cola.put_nowait(evento)
+    except asyncio.QueueFull:
+        # Cliente lento: se vacía su cola y el None le cierra el stream
+        while not cola.empty():
+            cola.get_nowait()
+        cola.put_nowait(None)
+
+
+difusor = Difusor(EVENTOS_BUFFER)
+
+
+def serializar(evento: dict) -> bytes:
+    return orjson.dumps(evento, default=_por_defecto)
+
+
+# --- TRANSACCIONES ---
+
+def _antes_de_confirmar(sesion: Session):
+    eventos = sesion.info.get("eventos")
+    if not eventos or EVENTOS_BACKEND != "postgres":
+        return
+    mensajes = []
+    for evento in eventos:
+        mensaje = serializar(evento).decode()
+        if len(mensaje.encode()) > MAXIMO_NOTIFY:
+            mensaje = serializar({"id": evento["id"], "entidad": evento["entidad"], "accion": "recargar"}).decode()
+        mensajes.append(mensaje)
+    # Postgres entrega los NOTIFY al confirmar y los descarta si la transacción se revierte
+    sesion.execute(
+        text("SELECT pg_notify(:canal, m) FROM unnest(CAST(:mensajes AS text[])) AS m"),
+        {"canal": CANAL, "mensajes": mensajes},
+    )
+
+def _al_confirmar(sesion: Session):
+    eventos = sesion.info.pop("eventos", None)
+    if eventos and EVENTOS_BACKEND != "postgres":
+        difusor.entregar(eventos)
+
+def _al_revertir(sesion: Session):
+    sesion.info.pop("eventos", None)
+
+event.listen(Session, "before_commit", _antes_de_confirmar)
+event.listen(Session, "after_commit", _al_confirmar)
+event.listen(Session, "after_rollback", _al_revertir)
+
+
+# --- LISTEN/NOTIFY ---
+
+_escucha: Optional[threading.Thread] = None
+_detener = threading.Event()
+
+def _conectar_listen():
+    import psycopg2
+    from sqlalchemy.engine import make_url
+    from app.config import db_config
+
+    url = make_url(EVENTOS_URL or db_config.url)
+    conexion = psycopg2.connect(**url.translate_connect_args(username="user", database="dbname"), **url.query)
+    conexion.set_session(autocommit=True)
+    conexion.cursor().execute(f"LISTEN {CANAL}")
+    return conexion
+
+def _escuchar():
+    espera, conexion = 1, None
+    while not _detener.is_set():
+        try:
+            if conexion is None:
+                conexion = _conectar_listen()
+                if espera > 1:
+                    # Lo notificado mientras no había conexión se perdió: todos los clientes recargan
+                    difusor.entregar([{"id": nuevo_id(), "entidad": "*", "accion": "recargar"}])
+                espera = 1
+            if select.select([conexion], [], [], 5)[0]:
+                conexion.poll()
+                eventos = [orjson.loads(n.payload) for n in conexion.notifies if n.channel == CANAL]
+                conexion.notifies.clear()
+                if eventos:
+                    difusor.entregar(eventos)
+        except Exception:
+            if conexion is not None:
+                try:
+                    conexion.close()
+                except Exception:
+                    pass
+            conexion = None
+            time.sleep(espera)
+            espera = min(espera * 2, 30)
+    if conexion is not None:
+        conexion.close()
+
+def iniciar():
+    global _escucha
+    if EVENTOS_BACKEND != "postgres" or _escucha is not None:
+        return
+    _detener.clear()
+    _escucha = threading.Thread(target=_escuchar, name="eventos-listen", daemon=True)
+    _escucha.start()
+
+def cerrar():
+    global _escucha
+    _detener.set()
+    if _escucha is not None:
+        _escucha.join(timeout=6)
+        _escucha = None
@@ -0,0 +1,92 @@
+import csv
+import io
+import os
+import tempfile
+from typing import Iterable, Iterator
+from app import crud, graficos, schemas
+from app.database import SessionLocal
+
+COLUMNAS_REPORTE = list(schemas.MantencionReporte.model_fields)
+TAMANO_LOTE = 1000
+TAMANO_BLOQUE = 64 * 1024
+
+def filas_csv(filas: Iterable) -> Iterator[bytes]:
+    # BOM para que Excel reconozca los acentos al abrir el CSV
+    buffer = io.StringIO()
+    buffer.write("\ufeff")
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNAS_REPORTE)
+    for i, fila in enumerate(filas, start=1):
+        writer.writerow(fila)
+        if i % TAMANO_LOTE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def escribir_xlsx(filas: Iterable, ruta: str):
+    # Import diferido: solo la exportación a Excel paga la carga de xlsxwriter
+    import xlsxwriter
+
+    # constant_memory escribe cada fila a disco apenas se completa
+    workbook = xlsxwriter.Workbook(ruta, {"constant_memory": True, "default_date_format": "yyyy-mm-dd"})
+    hoja = workbook.add_worksheet("Reporte")
+    hoja.write_row(0, 0, COLUMNAS_REPORTE)
+    for i, fila in enumerate(filas, start=1):
+        hoja.write_row(i, 0, fila)
+    workbook.close()
+
+def _filas_reporte(filtros: schemas.ReporteFiltros) -> Iterator:
+    # La sesión vive lo mismo que la respuesta, no lo que dura el handler
+    db = SessionLocal()
+    try:
+        yield from crud.iterar_reporte_mantenciones(db, **filtros.model_dump(), tamano_lote=TAMANO_LOTE)
+    finally:
+        db.close()
+
+def stream_csv(filtros: schemas.ReporteFiltros) -> Iterator[bytes]:
+    yield from filas_csv(_filas_reporte(filtros))
+
+def stream_xlsx(filtros: schemas.ReporteFiltros) -> Iterator[bytes]:
+    # El zip del xlsx solo queda completo al cerrarlo, así que se arma en un archivo temporal
+    # y desde ahí se envía por bloques
+    fd, ruta = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        escribir_xlsx(_filas_reporte(filtros), ruta)
+        with open(ruta, "rb") as archivo:
+            while bloque := archivo.read(TAMANO_BLOQUE):
+                yield bloque
+    finally:
+        os.remove(ruta)
+
+def exportar_a_archivo(formato: str, filtros: dict, ruta: str) -> int:
+    # Corre dentro de un proceso del pool de app.trabajos: escribe a un archivo parcial y lo
+    # renombra al final, así nunca se descarga un archivo a medias
+    filtros = schemas.ReporteFiltros(**filtros)
+    parcial = f"{ruta}.parcial"
+    try:
+        if formato == "xlsx":
+            escribir_xlsx(_filas_reporte(filtros), parcial)
+        elif formato == "csv":
+            with open(parcial, "wb") as archivo:
+                for bloque in filas_csv(_filas_reporte(filtros)):
+                    archivo.write(bloque)
+        elif formato == "png":
+            with SessionLocal() as db:
+                totales = crud.agregar_reporte_mantenciones(db, "tipo", **filtros.model_dump())
+            if not totales:
+                raise ValueError("No hay datos para graficar")
+            png = graficos.renderizar_costos_por_tipo(
+                [t.clave for t in totales], [float(t.costo_total) for t in totales]
+            )
+            with open(parcial, "wb") as archivo:
+                archivo.write(png)
+        else:
+            raise ValueError(f"Formato no soportado: {formato}")
+        os.replace(parcial, ruta)
+    finally:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+    return os.path.getsize(ruta)
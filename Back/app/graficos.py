@@ -0,0 +1,99 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+# Este módulo se importa también dentro de los procesos del pool: app.config (y el resto de app.*)
+# se importa solo dentro de las funciones que corren en el servidor
+
+_executor: Optional[ProcessPoolExecutor] = None
+_cache: Optional["CacheGraficos"] = None
+_lock_executor = threading.Lock()
+
+
+def renderizar_costos_por_tipo(etiquetas: List[str], valores: List[float]) -> bytes:
+    # API orientada a objetos: cada llamada tiene su propia Figure, sin estado global de pyplot
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    ax.bar(etiquetas, valores, color="skyblue")
+    ax.set_title("Costos por Tipo de Mantención")
+    ax.set_ylabel("Costo Total")
+    ax.set_xlabel("Tipo de Mantención")
+    ax.tick_params(axis="x", labelrotation=90)
+    fig.tight_layout()
+
+    img_bytes = io.BytesIO()
+    fig.savefig(img_bytes, format="png")
+    return img_bytes.getvalue()
+
+
+class CacheGraficos:
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self._datos: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave: str) -> Optional[bytes]:
+        with self._lock:
+            png = self._datos.get(clave)
+            if png is not None:
+                self._datos.move_to_end(clave)
+            return png
+
+    def set(self, clave: str, png: bytes):
+        with self._lock:
+            self._datos[clave] = png
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+
+def _cache_graficos() -> CacheGraficos:
+    global _cache
+    with _lock_executor:
+        if _cache is None:
+            from app.config import app_config
+
+            _cache = CacheGraficos(app_config.graficos_cache)
+        return _cache
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    with _lock_executor:
+        if _executor is None:
+            from app.config import app_config
+
+            # spawn: no se heredan los hilos ni las conexiones del proceso del servidor
+            _executor = ProcessPoolExecutor(
+                max_workers=app_config.graficos_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def cerrar():
+    global _executor
+    with _lock_executor:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def clave_grafico(filtros: dict, totales: Sequence) -> str:
+    # La clave depende del contenido del gráfico, así que nunca queda obsoleta
+    contenido = {"filtros": filtros, "totales": [[t.clave, float(t.costo_total)] for t in totales]}
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True, default=str).encode()).hexdigest()
+
+def costos_por_tipo(clave: str, totales: Sequence) -> bytes:
+    cache = _cache_graficos()
+    png = cache.get(clave)
+    if png is None:
+        futuro = _pool().submit(
+            renderizar_costos_por_tipo, [t.clave for t in totales], [float(t.costo_total) for t in totales]
+        )
+        png = futuro.result()
+        cache.set(clave, png)
+    return png
@@ -0,0 +1,142 @@
+import csv
+import json
+from datetime import date
+from tempfile import SpooledTemporaryFile
+from typing import Callable, Iterator, List, Optional, Tuple
+from fastapi import Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+from app import crud, schemas
+
+TAMANO_LOTE = 1000
+# Hasta 8 MB el cuerpo queda en memoria; sobre eso se vuelca a disco
+MAXIMO_EN_MEMORIA = 8 * 1024 * 1024
+
+FORMATOS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+CUERPO_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "text/csv": {"schema": {"type": "string"}},
+            "application/x-ndjson": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+def formato_desde_content_type(content_type: Optional[str]) -> Optional[str]:
+    tipo = (content_type or "").split(";")[0].strip().lower()
+    return FORMATOS.get(tipo)
+
+async def recibir_cuerpo(request: Request) -> SpooledTemporaryFile:
+    archivo = SpooledTemporaryFile(max_size=MAXIMO_EN_MEMORIA)
+    async for bloque in request.stream():
+        archivo.write(bloque)
+    archivo.seek(0)
+    return archivo
+
+ERROR_CODIFICACION = "El archivo no está en UTF-8 (en Excel: guardar como «CSV UTF-8»)."
+
+def _decodificar(linea: bytes, primera: bool) -> str:
+    # Línea a línea, para que un byte inválido se reporte en la fila donde aparece
+    return linea.decode("utf-8-sig" if primera else "utf-8")
+
+def leer_filas(archivo, formato: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    if formato == "csv":
+        # La fila 1 es la cabecera, así que los datos parten en la 2
+        numero = 1
+        try:
+            lineas = (_decodificar(linea, i == 0) for i, linea in enumerate(archivo))
+            for numero, fila in enumerate(csv.DictReader(lineas), start=2):
+                # DictReader deja las celdas sobrantes bajo la clave None
+                if None in fila:
+                    yield numero, None, "La fila tiene columnas de más."
+                    continue
+                # Las celdas vacías se tratan como valores ausentes
+                yield numero, {k: (v if v != "" else None) for k, v in fila.items()}, None
+        except UnicodeDecodeError:
+            # Sin decodificar no se sabe dónde termina la fila (puede tener saltos entre comillas): se
+            # corta la lectura
+            yield numero + 1, None, ERROR_CODIFICACION
+        except csv.Error as e:
+            yield numero + 1, None, f"CSV inválido: {e}"
+        return
+    for numero, linea in enumerate(archivo, start=1):
+        try:
+            linea = _decodificar(linea, numero == 1)
+        except UnicodeDecodeError:
+            yield numero, None, ERROR_CODIFICACION
+            continue
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except json.JSONDecodeError as e:
+            yield numero, None, f"JSON inválido: {e.msg}"
+            continue
+        if not isinstance(fila, dict):
+            yield numero, None, "Cada línea debe ser un objeto JSON"
+            continue
+        yield numero, fila, None
+
+def _mensaje_validacion(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+
+def _importar(
+    db: Session,
+    archivo,
+    formato: str,
+    schema: type[BaseModel],
+    insertar_lote: Callable[[Session, List[Tuple[int, dict]]], Tuple[int, List[schemas.ErrorImportacion]]],
+    validar: Optional[Callable[[BaseModel], Optional[str]]] = None,
+) -> schemas.ResultadoImportacion:
+    insertados = 0
+    errores: List[schemas.ErrorImportacion] = []
+    lote: List[Tuple[int, dict]] = []
+
+    def vaciar_lote():
+        nonlocal insertados
+        n, errores_lote = insertar_lote(db, lote)
+        insertados += n
+        errores.extend(errores_lote)
+        lote.clear()
+
+    for numero, fila, error in leer_filas(archivo, formato):
+        if error is None:
+            try:
+                registro = schema(**fila)
+                error = validar(registro) if validar else None
+            except ValidationError as e:
+                error = _mensaje_validacion(e)
+            except TypeError:
+                # Claves que no son texto, p. ej. una fila CSV con más celdas que la cabecera
+                error = "La fila tiene columnas de más."
+        if error:
+            errores.append(schemas.ErrorImportacion(fila=numero, error=error))
+            continue
+        lote.append((numero, registro.model_dump()))
+        if len(lote) >= TAMANO_LOTE:
+            vaciar_lote()
+    vaciar_lote()
+
+    errores.sort(key=lambda e: e.fila)
+    return schemas.ResultadoImportacion(insertados=insertados, errores=errores)
+
+def _validar_mantencion(mantencion: schemas.MantencionCreate) -> Optional[str]:
+    if mantencion.fecha > date.today():
+        return "La fecha no puede ser futura."
+    return None
+
+def importar_vehiculos(db: Session, archivo, formato: str) -> schemas.ResultadoImportacion:
+    return _importar(db, archivo, formato, schemas.VehiculoCreate, crud.importar_vehiculos_lote)
+
+def importar_mantenciones(db: Session, archivo, formato: str) -> schemas.ResultadoImportacion:
+    return _importar(
+        db, archivo, formato, schemas.MantencionCreate, crud.importar_mantenciones_lote, _validar_mantencion
+    )
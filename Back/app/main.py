@@ -1,6 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import vehiculos, proveedores, mantenciones, programar_mantenciones, reportes, direcciones
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.exc import SQLAlchemyError
+from app import crud, eventos, graficos, trabajos
+from app.database import DB_ASYNC, SessionLocal, estadisticas_pool
+from app.metricas import MiddlewareMetricas, registro
+from app.config import db_config
+from app.paginacion import HEADER_CURSOR
+from app.routers import vehiculos, proveedores, mantenciones, programar_mantenciones, reportes, direcciones, busqueda
+from app.routers import eventos as router_eventos
 
 app = FastAPI(title="Fruselva API")
 
@@ -15,16 +23,62 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  
     allow_headers=["*"],
+    expose_headers=[HEADER_CURSOR],
 )
 
+# Latencia, consultas SQL, tiempo en la base y espera del pool por ruta (GET /metrics y
+# cabecera Server-Timing). Con db_max_consultas además falla cualquier endpoint que lance más
+# sentencias que ese tope (p. ej. un N+1)
+app.add_middleware(MiddlewareMetricas, max_consultas=db_config.max_consultas or None)
+
 @app.get("/")
 def read_root():
     return {"message": "¡API funcionando correctamente!"}
 
+@app.on_event("startup")
+def preparar_particiones():
+    # Con la base caída la API arranca igual: mientras falte la partición del año, las filas van a
+    # mantenciones_default y se mueven cuando se crea
+    try:
+        with SessionLocal() as db:
+            crud.asegurar_particiones_mantenciones(db)
+    except SQLAlchemyError:
+        pass
+
+@app.on_event("startup")
+def escuchar_eventos():
+    # Solo con eventos_backend=postgres: hilo con LISTEN que alimenta GET /eventos
+    eventos.iniciar()
+
+@app.on_event("startup")
+def purgar_trabajos():
+    # Borra cada minuto los reportes vencidos (trabajos_retencion_s), aunque nadie consulte
+    trabajos.iniciar()
+
+@app.on_event("shutdown")
+def cerrar_pools():
+    graficos.cerrar()
+    trabajos.cerrar()
+    eventos.cerrar()
+
+@app.get("/db/pool")
+def estado_pool():
+    return estadisticas_pool()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metricas():
+    return PlainTextResponse(registro.exportar(), media_type="text/plain; version=0.0.4")
+
+if DB_ASYNC:
+    from app.routers import consultas_async
+    app.include_router(consultas_async.router)
+
 app.include_router(vehiculos.router)
 app.include_router(proveedores.router)
 app.include_router(mantenciones.router)
 app.include_router(programar_mantenciones.router)
 app.include_router(reportes.router)
-app.include_router(direcciones.router) 
+app.include_router(direcciones.router)
+app.include_router(busqueda.router)
+app.include_router(router_eventos.router)
 
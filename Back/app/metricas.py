@@ -0,0 +1,165 @@
+import time
+from threading import Lock
+from typing import Dict, Optional, Tuple
+from app.database import contar_consultas, estadisticas_pool
+
+# Métricas por ruta en formato de texto de Prometheus, sin dependencias externas
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100)
+
+
+class Histograma:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.suma += valor
+        self.total += 1
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[i] += 1
+                break
+
+    def lineas(self, nombre: str, etiquetas: str) -> list:
+        lineas, acumulado = [], 0
+        for limite, conteo in zip(self.buckets, self.conteos):
+            acumulado += conteo
+            lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+        lineas.append(f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {self.total}')
+        lineas.append(f"{nombre}_sum{{{etiquetas}}} {self.suma}")
+        lineas.append(f"{nombre}_count{{{etiquetas}}} {self.total}")
+        return lineas
+
+
+class MetricasRuta:
+    def __init__(self):
+        self.latencia = Histograma(BUCKETS_LATENCIA)
+        self.consultas = Histograma(BUCKETS_CONSULTAS)
+        self.tiempo_db_s = 0.0
+        self.espera_pool_s = 0.0
+        self.bytes_respuesta = 0
+        self.por_estado: Dict[int, int] = {}
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._rutas: Dict[Tuple[str, str], MetricasRuta] = {}
+        self._lock = Lock()
+
+    def registrar(self, metodo: str, ruta: str, estado: int, duracion: float, contador: dict, bytes_respuesta: int):
+        with self._lock:
+            metricas = self._rutas.setdefault((metodo, ruta), MetricasRuta())
+            metricas.latencia.observar(duracion)
+            metricas.consultas.observar(contador["consultas"])
+            metricas.tiempo_db_s += contador["tiempo_db_s"]
+            metricas.espera_pool_s += contador["espera_pool_s"]
+            metricas.bytes_respuesta += bytes_respuesta
+            metricas.por_estado[estado] = metricas.por_estado.get(estado, 0) + 1
+
+    def exportar(self) -> str:
+        # El formato exige que las muestras de cada familia vayan juntas bajo su # TYPE
+        familias = {
+            "http_request_duration_seconds": ("histogram", []),
+            "http_requests_total": ("counter", []),
+            "http_response_size_bytes_total": ("counter", []),
+            "db_statements_per_request": ("histogram", []),
+            "db_time_seconds_total": ("counter", []),
+            "db_pool_wait_seconds_total": ("counter", []),
+            "db_pool_connections": ("gauge", []),
+            "db_pool_checkouts_total": ("counter", []),
+            "db_pool_timeouts_total": ("counter", []),
+        }
+        with self._lock:
+            for (metodo, ruta), m in sorted(self._rutas.items()):
+                etiquetas = f'method="{metodo}",route="{_escapar(ruta)}"'
+                familias["http_request_duration_seconds"][1].extend(
+                    m.latencia.lineas("http_request_duration_seconds", etiquetas)
+                )
+                familias["http_requests_total"][1].extend(
+                    f'http_requests_total{{{etiquetas},status="{e}"}} {n}' for e, n in sorted(m.por_estado.items())
+                )
+                familias["http_response_size_bytes_total"][1].append(
+                    f"http_response_size_bytes_total{{{etiquetas}}} {m.bytes_respuesta}"
+                )
+                familias["db_statements_per_request"][1].extend(
+                    m.consultas.lineas("db_statements_per_request", etiquetas)
+                )
+                familias["db_time_seconds_total"][1].append(f"db_time_seconds_total{{{etiquetas}}} {m.tiempo_db_s}")
+                familias["db_pool_wait_seconds_total"][1].append(
+                    f"db_pool_wait_seconds_total{{{etiquetas}}} {m.espera_pool_s}"
+                )
+
+        pool = estadisticas_pool()
+        for estado in ("en_uso", "disponibles", "overflow"):
+            if estado in pool:
+                familias["db_pool_connections"][1].append(f'db_pool_connections{{state="{estado}"}} {pool[estado]}')
+        familias["db_pool_checkouts_total"][1].append(f"db_pool_checkouts_total {pool['checkouts']}")
+        familias["db_pool_timeouts_total"][1].append(f"db_pool_timeouts_total {pool['timeouts']}")
+
+        lineas = []
+        for nombre, (tipo, muestras) in familias.items():
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            lineas.extend(muestras)
+        return "\n".join(lineas) + "\n"
+
+
+registro = RegistroMetricas()
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"')
+
+def _nombre_ruta(scope: dict) -> str:
+    # Se usa la plantilla (/vehiculos/{id}) y no la URL real para acotar las series;
+    # lo que no calza con ninguna ruta se agrupa en una sola
+    ruta = scope.get("route")
+    if ruta is not None and hasattr(ruta, "path"):
+        return ruta.path
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", "sin_ruta")
+
+def _server_timing(duracion: float, contador: dict) -> str:
+    return (
+        f"app;dur={duracion * 1000:.2f}, "
+        f'db;dur={contador["tiempo_db_s"] * 1000:.2f};desc="{contador["consultas"]} consultas", '
+        f"pool;dur={contador['espera_pool_s'] * 1000:.2f}"
+    )
+
+
+class MiddlewareMetricas:
+    # Middleware ASGI puro: sigue midiendo mientras se envía el cuerpo de un StreamingResponse
+    def __init__(self, app, max_consultas: Optional[int] = None):
+        self.app = app
+        self.max_consultas = max_consultas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado, bytes_respuesta = 500, 0
+
+        with contar_consultas(self.max_consultas) as contador:
+            async def enviar(mensaje):
+                nonlocal estado, bytes_respuesta
+                if mensaje["type"] == "http.response.start":
+                    estado = mensaje["status"]
+                    # Con un stream solo alcanza a incluir lo medido hasta enviar las cabeceras
+                    timing = _server_timing(time.perf_counter() - inicio, contador)
+                    mensaje["headers"] = list(mensaje.get("headers", [])) + [(b"server-timing", timing.encode())]
+                elif mensaje["type"] == "http.response.body":
+                    bytes_respuesta += len(mensaje.get("body", b""))
+                await send(mensaje)
+
+            try:
+                await self.app(scope, receive, enviar)
+            finally:
+                registro.registrar(
+                    scope["method"], _nombre_ruta(scope), estado,
+                    time.perf_counter() - inicio, contador, bytes_respuesta,
+                )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text
+from sqlalchemy import DDL, BigInteger, Column, Integer, String, Date, DateTime, ForeignKey, Text, Index, event
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -65,6 +65,16 @@ class Mantencion(Base):
     tipo = relationship("TipoMantencion", back_populates="mantenciones")
     proveedor = relationship("Proveedor", back_populates="mantenciones")
 
+# Último kilometraje / última mantención de un vehículo en una sola búsqueda de índice
+Index("ix_mantenciones_vehiculo_kilometraje", Mantencion.vehiculo_id, Mantencion.kilometraje.desc())
+Index("ix_mantenciones_vehiculo_fecha", Mantencion.vehiculo_id, Mantencion.fecha.desc())
+# Reportes por rango de fechas. En Postgres la tabla está particionada por año de fecha, con clave
+# primaria (id, fecha) (migrations/versions/0002). BRIN sobre fecha, más los compuestos FK + fecha
+# para los filtros por tipo y proveedor; en SQLite el BRIN queda como un índice común
+Index("ix_mantenciones_fecha", Mantencion.fecha, postgresql_using="brin")
+Index("ix_mantenciones_tipo_fecha", Mantencion.tipo_id, Mantencion.fecha)
+Index("ix_mantenciones_proveedor_fecha", Mantencion.proveedor_id, Mantencion.fecha)
+
 class ProgramarMantencion(Base):
     __tablename__ = "programar_mantencion"
 
@@ -80,3 +90,67 @@ class ProgramarMantencion(Base):
 
     vehiculo = relationship("Vehiculo", back_populates="programaciones")
     tipo = relationship("TipoMantencion")
+
+# Búsquedas por rango de vencimiento en /programar-mantenciones/proximas
+Index("ix_programar_mantencion_siguiente_fecha", ProgramarMantencion.siguiente_fecha_estimada)
+Index(
+    "ix_programar_mantencion_vehiculo_siguiente_km",
+    ProgramarMantencion.vehiculo_id,
+    ProgramarMantencion.siguiente_kilometraje_estimado,
+)
+
+class ResumenMensualCosto(Base):
+    # Rollup de mantenciones por mes; lo mantiene crud.py en cada escritura.
+    # Las claves usan 0 cuando la mantención no tiene vehículo, tipo o proveedor
+    __tablename__ = "resumen_mensual_costos"
+
+    mes = Column(Date, primary_key=True)
+    vehiculo_id = Column(Integer, primary_key=True)
+    tipo_id = Column(Integer, primary_key=True)
+    proveedor_id = Column(Integer, primary_key=True)
+    costo_total = Column(BigInteger, nullable=False, default=0)
+    cantidad = Column(Integer, nullable=False, default=0)
+    kilometraje_max = Column(Integer)
+
+class ClaveIdempotencia(Base):
+    # Respuesta guardada por cada Idempotency-Key: un reintento con la misma clave y el mismo
+    # cuerpo recibe esa respuesta sin volver a aplicar los cambios
+    __tablename__ = "claves_idempotencia"
+
+    endpoint = Column(String, primary_key=True)
+    clave = Column(String, primary_key=True)
+    huella = Column(String(64), nullable=False)
+    respuesta = Column(Text, nullable=False)
+    creado = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+# --- Búsqueda (solo Postgres) ---
+
+# Índices GIN de GET /buscar: trigramas (pg_trgm) para patente, marca/modelo, nombre de proveedor
+# y descripción, y tsvector para la búsqueda por palabras en la descripción. Las expresiones deben
+# coincidir con las de crud.buscar para que el planner use los índices. En SQLite no se crean y
+# la búsqueda usa LIKE
+event.listen(
+    Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+INDICES_BUSQUEDA = {
+    Vehiculo.__table__: [
+        "CREATE INDEX IF NOT EXISTS ix_vehiculos_patente_trgm ON vehiculos USING gin (patente gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_vehiculos_marca_modelo_trgm ON vehiculos "
+        "USING gin ((marca || ' ' || modelo) gin_trgm_ops)",
+    ],
+    Proveedor.__table__: [
+        "CREATE INDEX IF NOT EXISTS ix_proveedores_nombre_trgm ON proveedores USING gin (nombre gin_trgm_ops)",
+    ],
+    Mantencion.__table__: [
+        "CREATE INDEX IF NOT EXISTS ix_mantenciones_descripcion_tsv ON mantenciones "
+        "USING gin (to_tsvector('spanish', coalesce(descripcion, '')))",
+        "CREATE INDEX IF NOT EXISTS ix_mantenciones_descripcion_trgm ON mantenciones "
+        "USING gin (descripcion gin_trgm_ops)",
+    ],
+}
+
+for tabla, sentencias in INDICES_BUSQUEDA.items():
+    for sentencia in sentencias:
+        event.listen(tabla, "after_create", DDL(sentencia).execute_if(dialect="postgresql"))
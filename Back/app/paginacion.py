@@ -0,0 +1,152 @@
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import Query, Response
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.serializacion import Serializador, respuesta_json
+
+LIMITE_MAXIMO = 500
+HEADER_CURSOR = "X-Next-Cursor"
+
+
+class ParametrosPagina:
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor opaco devuelto en X-Next-Cursor"),
+        limite: Optional[int] = Query(None, alias="limit", ge=1, le=LIMITE_MAXIMO),
+        campos: Optional[str] = Query(None, alias="fields", description="Columnas separadas por coma"),
+    ):
+        self.cursor = cursor
+        self.limite = limite
+        self.campos = campos
+
+    def dict(self) -> dict:
+        return {"cursor": self.cursor, "limite": self.limite, "campos": self.campos}
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    datos = json.dumps([v.isoformat() if isinstance(v, date) else v for v in valores])
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str, orden: Sequence) -> list:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != len(orden):
+            raise ValueError
+        return [
+            date.fromisoformat(v) if col.type.python_type is date else col.type.python_type(v)
+            for v, col in zip(valores, orden)
+        ]
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Cursor inválido")
+
+def seleccionar_campos(modelo, campos: Optional[str]) -> Optional[List[str]]:
+    if not campos:
+        return None
+    columnas = modelo.__table__.columns.keys()
+    seleccion = [c.strip() for c in campos.split(",") if c.strip()]
+    desconocidos = [c for c in seleccion if c not in columnas]
+    if desconocidos:
+        raise ValueError(f"Campos no válidos: {', '.join(desconocidos)}")
+    return seleccion
+
+def _despues_de(orden: Sequence, valores: Sequence, descendente: bool):
+    # (a, b) > (va, vb)  <=>  a > va OR (a = va AND b > vb)
+    col, valor = orden[0], valores[0]
+    mayor = col < valor if descendente else col > valor
+    if len(orden) == 1:
+        return mayor
+    return or_(mayor, and_(col == valor, _despues_de(orden[1:], valores[1:], descendente)))
+
+def consulta_paginada(
+    modelo,
+    orden: Sequence,
+    cursor: Optional[str] = None,
+    limite: Optional[int] = None,
+    campos: Optional[List[str]] = None,
+    filtros: Sequence = (),
+    descendente: bool = False,
+    opciones: Sequence = (),
+    base=None,
+):
+    if base is not None:
+        # Consulta de columnas ya armada (Serializador.consulta); el orden se agrega al final si falta
+        presentes = set(base.selected_columns.keys())
+        stmt = base.add_columns(*[col for col in orden if col.key not in presentes])
+    elif campos:
+        # Las columnas del orden se agregan siempre para poder armar el siguiente cursor
+        extra = [col for col in orden if col.key not in campos]
+        stmt = select(*[getattr(modelo, c) for c in campos], *extra)
+    else:
+        stmt = select(modelo).options(*opciones)
+
+    for filtro in filtros:
+        stmt = stmt.where(filtro)
+    if cursor:
+        stmt = stmt.where(_despues_de(orden, decodificar_cursor(cursor, orden), descendente))
+
+    stmt = stmt.order_by(*[col.desc() if descendente else col for col in orden])
+    if limite:
+        stmt = stmt.limit(limite + 1)
+    return stmt
+
+def armar_pagina(
+    filas: list,
+    orden: Sequence,
+    limite: Optional[int] = None,
+    campos: Optional[List[str]] = None,
+) -> Tuple[list, Optional[str]]:
+    siguiente = None
+    if limite and len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor([getattr(filas[-1], col.key) for col in orden])
+    if campos:
+        # Las columnas pedidas van primero en la fila; las del orden agregadas al final sobran
+        filas = [dict(zip(campos, f)) for f in filas]
+    return filas, siguiente
+
+def _preparar(modelo, orden, cursor, limite, campos, serializador: Optional[Serializador], kwargs):
+    campos = seleccionar_campos(modelo, campos)
+    if serializador is not None and not campos:
+        kwargs["base"] = serializador.consulta(modelo)
+    return campos, consulta_paginada(modelo, orden, cursor, limite, campos, **kwargs)
+
+def _terminar(resultado, orden, limite, campos, serializador: Optional[Serializador]):
+    if campos:
+        filas, siguiente = armar_pagina(resultado.all(), orden, limite, campos)
+        return (serializador.proyectar(filas) if serializador is not None else filas), siguiente
+    if serializador is not None:
+        filas, siguiente = armar_pagina(resultado.all(), orden, limite)
+        return serializador.filas(filas), siguiente
+    return armar_pagina(resultado.scalars().all(), orden, limite)
+
+def paginar(db: Session, modelo, orden: Sequence, cursor=None, limite=None, campos=None, serializador=None, **kwargs):
+    # Con serializador se leen solo las columnas del schema y se devuelven dicts, sin entidades ORM
+    campos, stmt = _preparar(modelo, orden, cursor, limite, campos, serializador, kwargs)
+    return _terminar(db.execute(stmt), orden, limite, campos, serializador)
+
+async def paginar_async(db: AsyncSession, modelo, orden: Sequence, cursor=None, limite=None, campos=None, serializador=None, **kwargs):
+    campos, stmt = _preparar(modelo, orden, cursor, limite, campos, serializador, kwargs)
+    return _terminar(await db.execute(stmt), orden, limite, campos, serializador)
+
+def respuesta_paginada(
+    response: Response,
+    items: list,
+    siguiente: Optional[str],
+    campos: Optional[str],
+    headers: Optional[dict] = None
+):
+    headers = dict(headers or {})
+    if siguiente:
+        headers[HEADER_CURSOR] = siguiente
+    if items and not isinstance(items[0], dict):
+        # Entidades ORM: las valida y serializa el response_model de la ruta
+        response.headers.update(headers)
+        return items
+    # Filas ya armadas (Serializador o proyección con fields=) van directo a orjson
+    return respuesta_json(items, headers)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app import crud, schemas
+from app.database import get_db
+
+router = APIRouter(prefix="/buscar", tags=["Búsqueda"])
+
+@router.get("/", response_model=List[schemas.ResultadoBusqueda])
+def buscar(
+    q: str = Query(..., min_length=2, description="Patente, marca/modelo, proveedor o texto de la descripción"),
+    limite: int = Query(20, alias="limit", ge=1, le=100),
+    tipos: Optional[str] = Query(None, description="vehiculo, proveedor y/o mantencion, separados por coma"),
+    db: Session = Depends(get_db),
+):
+    try:
+        filas = crud.buscar(db, q, limite, [t.strip() for t in tipos.split(",") if t.strip()] if tipos else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return crud.FILAS["busqueda"].respuesta(filas)
@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List
+from datetime import date
+from app import crud_async, schemas
+from app.cache import no_modificado
+from app.database import get_async_db
+from app.paginacion import ParametrosPagina, respuesta_paginada
+
+# Con db_async=true main.py registra este router antes que los síncronos, así que estas
+# lecturas toman precedencia sobre las rutas equivalentes y el resto sigue igual.
+router = APIRouter()
+
+@router.get("/vehiculos/", response_model=List[schemas.Vehiculo], tags=["Vehículos"])
+async def listar_vehiculos(response: Response, pagina: ParametrosPagina = Depends(), db: AsyncSession = Depends(get_async_db)):
+    try:
+        vehiculos, siguiente = await crud_async.obtener_vehiculos(db, **pagina.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return respuesta_paginada(response, vehiculos, siguiente, pagina.campos)
+
+@router.get("/vehiculos/{patente}", response_model=schemas.Vehiculo, tags=["Vehículos"])
+async def obtener_vehiculo_por_patente(patente: str, db: AsyncSession = Depends(get_async_db)):
+    vehiculo = await crud_async.get_vehiculo_por_patente(db, patente)
+    if not vehiculo:
+        raise HTTPException(status_code=404, detail="Vehículo no encontrado.")
+    return vehiculo
+
+@router.get("/proveedores/", response_model=List[schemas.ProveedorOut], tags=["Proveedores"])
+async def api_listar_proveedores(request: Request, response: Response, pagina: ParametrosPagina = Depends(), db: AsyncSession = Depends(get_async_db)):
+    try:
+        entrada = await crud_async.obtener_proveedores(db, **pagina.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    proveedores, siguiente = entrada.valor
+    return no_modificado(request, entrada.etag) or respuesta_paginada(
+        response, proveedores, siguiente, pagina.campos, {"ETag": entrada.etag}
+    )
+
+@router.get("/direcciones/", response_model=List[schemas.DireccionOut], tags=["Direcciones"])
+async def listar_direcciones(request: Request, response: Response, pagina: ParametrosPagina = Depends(), db: AsyncSession = Depends(get_async_db)):
+    try:
+        entrada = await crud_async.obtener_direcciones(db, **pagina.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    direcciones, siguiente = entrada.valor
+    return no_modificado(request, entrada.etag) or respuesta_paginada(
+        response, direcciones, siguiente, pagina.campos, {"ETag": entrada.etag}
+    )
+
+@router.get("/mantenciones/", response_model=List[schemas.MantencionBase], tags=["Mantenciones"])
+async def api_listar_mantenciones(
+    response: Response,
+    fecha_desde: Optional[date] = Query(None, description="Fecha desde para filtrar"),
+    fecha_hasta: Optional[date] = Query(None, description="Fecha hasta para filtrar"),
+    pagina: ParametrosPagina = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        mantenciones, siguiente = await crud_async.obtener_mantenciones(db, fecha_desde, fecha_hasta, **pagina.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return respuesta_paginada(response, mantenciones, siguiente, pagina.campos)
+
+@router.get("/mantenciones/tipos_mantencion", response_model=List[schemas.TipoMantencion], tags=["Mantenciones"])
+async def listar_tipos_mantencion(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    entrada = await crud_async.obtener_tipos_mantencion(db)
+    response.headers["ETag"] = entrada.etag
+    return no_modificado(request, entrada.etag) or entrada.valor
+
+@router.get("/programar-mantenciones/", response_model=List[schemas.ProgramarMantencion], tags=["Programar Mantenciones"])
+async def listar_programaciones(response: Response, pagina: ParametrosPagina = Depends(), db: AsyncSession = Depends(get_async_db)):
+    try:
+        programaciones, siguiente = await crud_async.obtener_programaciones(db, **pagina.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return respuesta_paginada(response, programaciones, siguiente, pagina.campos)
+
+@router.get("/programar-mantenciones/{id:int}", response_model=schemas.ProgramarMantencion, tags=["Programar Mantenciones"])
+async def obtener_programacion(id: int, db: AsyncSession = Depends(get_async_db)):
+    programacion = await crud_async.get_programacion(db, id)
+    if not programacion:
+        raise HTTPException(status_code=404, detail="Programación no encontrada")
+    return programacion
@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
+from app.cache import no_modificado
 from app.database import get_db
-from app import models, schemas
+from app.paginacion import ParametrosPagina, respuesta_paginada
+from app import crud, schemas
 
 router = APIRouter(prefix="/direcciones", tags=["Direcciones"])
 
 @router.get("/", response_model=List[schemas.DireccionOut])
-def listar_direcciones(db: Session = Depends(get_db)):
-    direcciones = db.query(models.Direccion).all()
-    return direcciones
+def listar_direcciones(request: Request, response: Response, pagina: ParametrosPagina = Depends(), db: Session = Depends(get_db)):
+    try:
+        entrada = crud.obtener_direcciones(db, **pagina.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    direcciones, siguiente = entrada.valor
+    return no_modificado(request, entrada.etag) or respuesta_paginada(
+        response, direcciones, siguiente, pagina.campos, {"ETag": entrada.etag}
+    )
@@ -0,0 +1,72 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from app import eventos
+from app.config import app_config
+
+router = APIRouter(prefix="/eventos", tags=["Eventos"])
+
+# Un comentario cada tantos segundos mantiene viva la conexión a través de proxies y detecta
+# clientes que se fueron
+EVENTOS_PING_S = app_config.eventos_ping_s
+ENTIDADES = ("vehiculo", "proveedor", "direccion", "mantencion", "programacion")
+
+
+def _mensaje(evento: dict) -> bytes:
+    # event: entidad, para que el cliente escuche solo lo que muestra; "recargar" afecta a todas
+    nombre = "recargar" if evento["entidad"] == "*" else evento["entidad"]
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (evento["id"].encode(), nombre.encode(), eventos.serializar(evento))
+
+def _recargar() -> bytes:
+    # Lleva el id del último evento del buffer (o vacío, que reinicia Last-Event-ID): tras recargar
+    # el cliente retoma desde ahí y no vuelve a recibir "recargar" en la próxima reconexión
+    return _mensaje({"id": eventos.difusor.ultimo_id(), "entidad": "*", "accion": "recargar"})
+
+
+@router.get("/")
+async def stream_eventos(
+    request: Request,
+    entidades: Optional[str] = Query(None, description=f"Separadas por coma: {', '.join(ENTIDADES)}"),
+    desde: Optional[str] = Query(None, description="Id del último evento recibido (como Last-Event-ID)"),
+    last_event_id: Optional[str] = Header(None),
+):
+    # Server-sent events con los cambios de crud.py. Al reconectar, el navegador manda
+    # Last-Event-ID y el stream sigue desde ahí; si ese evento ya salió del buffer llega un
+    # evento "recargar" y el cliente vuelve a pedir los listados
+    filtro = {e.strip() for e in entidades.split(",") if e.strip()} if entidades else None
+    suscripcion, pendientes = eventos.difusor.suscribir(last_event_id or desde)
+    cola = suscripcion[1]
+
+    def incluir(evento: dict) -> bool:
+        return filtro is None or evento["entidad"] in filtro or evento["entidad"] == "*"
+
+    async def generar():
+        try:
+            yield b"retry: 3000\n\n"
+            if pendientes is None:
+                yield _recargar()
+            else:
+                for evento in pendientes:
+                    if incluir(evento):
+                        yield _mensaje(evento)
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), EVENTOS_PING_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield b": ping\n\n"
+                    continue
+                if evento is None:
+                    return
+                if incluir(evento):
+                    yield _mensaje(evento)
+        finally:
+            eventos.difusor.desuscribir(suscripcion)
+
+    return StreamingResponse(
+        generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
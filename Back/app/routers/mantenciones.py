@@ -1,21 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional, List
 from sqlalchemy.orm import Session
 from datetime import date
-from app import crud, schemas
+from app import crud, importacion, schemas
+from app.cache import no_modificado
 from app.database import get_db
+from app.paginacion import ParametrosPagina, respuesta_paginada
 
 router = APIRouter(prefix="/mantenciones", tags=["Mantenciones"])
 
 
 @router.get("/", response_model=List[schemas.MantencionBase])
 def api_listar_mantenciones(
+    response: Response,
     fecha_desde: Optional[date] = Query(None, description="Fecha desde para filtrar"),
     fecha_hasta: Optional[date] = Query(None, description="Fecha hasta para filtrar"),
+    pagina: ParametrosPagina = Depends(),
     db: Session = Depends(get_db)
 ):
     try:
-        return crud.obtener_mantenciones(db, fecha_desde, fecha_hasta)
+        mantenciones, siguiente = crud.obtener_mantenciones(db, fecha_desde, fecha_hasta, **pagina.dict())
+        return respuesta_paginada(response, mantenciones, siguiente, pagina.campos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback; traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error interno: {e}")
@@ -35,12 +43,22 @@ def crear_mantencion(mantencion: schemas.MantencionCreate, db: Session = Depends
     if mantencion.fecha > date.today():
         raise HTTPException(status_code=400, detail="La fecha no puede ser futura.")
 
-    # Kilometraje debe ser >= último registrado
-    ultimo_km = crud.obtener_ultimo_kilometraje(db, mantencion.vehiculo_id)
-    if ultimo_km is not None and mantencion.kilometraje < ultimo_km:
-        raise HTTPException(status_code=400, detail=f"El kilometraje debe ser mayor o igual al último registrado: {ultimo_km} km.")
+    # Kilometraje debe ser >= último registrado (lo valida el mismo INSERT)
+    try:
+        return crud.crear_mantencion(db, mantencion)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return crud.crear_mantencion(db, mantencion)
+@router.post("/bulk", response_model=schemas.ResultadoImportacion, openapi_extra=importacion.CUERPO_OPENAPI)
+async def importar_mantenciones(request: Request, db: Session = Depends(get_db)):
+    formato = importacion.formato_desde_content_type(request.headers.get("content-type"))
+    if not formato:
+        raise HTTPException(status_code=415, detail="Formato no soportado: use text/csv o application/x-ndjson.")
+    archivo = await importacion.recibir_cuerpo(request)
+    try:
+        return await run_in_threadpool(importacion.importar_mantenciones, db, archivo, formato)
+    finally:
+        archivo.close()
 
 @router.put("/{id}", response_model=schemas.Mantencion)
 def actualizar_mantencion(id: int, datos: schemas.MantencionCreate, db: Session = Depends(get_db)):
@@ -50,21 +68,21 @@ def actualizar_mantencion(id: int, datos: schemas.MantencionCreate, db: Session
     if datos.fecha > date.today():
         raise HTTPException(status_code=400, detail="La fecha no puede ser futura.")
 
-    mantencion_actual = crud.get_mantencion(db, id)
-    if not mantencion_actual:
+    try:
+        mantencion = crud.actualizar_mantencion(db, id, datos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not mantencion:
         raise HTTPException(status_code=404, detail="Mantención no encontrada")
-
-    # No permitir disminuir el kilometraje (para mantener orden lógico)
-    if datos.kilometraje < mantencion_actual.kilometraje:
-        raise HTTPException(status_code=400, detail=f"El kilometraje no puede ser menor al actual registrado: {mantencion_actual.kilometraje} km.")
-
-    return crud.actualizar_mantencion(db, id, datos)
+    return mantencion
 
 
 @router.get("/tipos_mantencion", response_model=List[schemas.TipoMantencion])
-def listar_tipos_mantencion(db: Session = Depends(get_db)):
+def listar_tipos_mantencion(request: Request, response: Response, db: Session = Depends(get_db)):
     try:
-        return crud.obtener_tipos_mantencion(db)
+        entrada = crud.obtener_tipos_mantencion(db)
+        response.headers["ETag"] = entrada.etag
+        return no_modificado(request, entrada.etag) or entrada.valor
     except Exception as e:
         import traceback; traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error al obtener tipos de mantención: {e}")
\ No newline at end of file
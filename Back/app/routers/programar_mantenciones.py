@@ -1,18 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app import crud, schemas
 from app.database import get_db
+from app.paginacion import LIMITE_MAXIMO, ParametrosPagina, respuesta_paginada
 
 router = APIRouter(prefix="/programar-mantenciones", tags=["Programar Mantenciones"])
 
 @router.post("/", response_model=schemas.ProgramarMantencion)
 def crear_programacion(programacion: schemas.ProgramarMantencionCreate, db: Session = Depends(get_db)):
-    return crud.crear_programacion(db, programacion)
+    try:
+        return crud.crear_programacion(db, programacion)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/recalcular")
+def recalcular_programaciones(db: Session = Depends(get_db)):
+    actualizadas = crud.recalcular_programaciones(db)
+    db.commit()
+    return {"actualizadas": actualizadas}
 
 @router.get("/", response_model=List[schemas.ProgramarMantencion])
-def listar_programaciones(db: Session = Depends(get_db)):
-    return crud.obtener_programaciones(db)
+def listar_programaciones(response: Response, pagina: ParametrosPagina = Depends(), db: Session = Depends(get_db)):
+    try:
+        programaciones, siguiente = crud.obtener_programaciones(db, **pagina.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return respuesta_paginada(response, programaciones, siguiente, pagina.campos)
+
+@router.get("/proximas", response_model=List[schemas.ProgramacionProxima])
+def listar_programaciones_proximas(
+    dias: Optional[int] = Query(None, ge=0, description="Vencen dentro de N días"),
+    km: Optional[int] = Query(None, ge=0, description="Vencen dentro de M km"),
+    limite: int = Query(100, alias="limit", ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db),
+):
+    # Primero las vencidas, luego por fecha y km restantes
+    return crud.obtener_programaciones_proximas(db, dias, km, limite)
 
 @router.get("/{id}", response_model=schemas.ProgramarMantencion)
 def obtener_programacion(id: int, db: Session = Depends(get_db)):
@@ -23,7 +47,10 @@ def obtener_programacion(id: int, db: Session = Depends(get_db)):
 
 @router.put("/{id}", response_model=schemas.ProgramarMantencion)
 def actualizar_programacion(id: int, datos: schemas.ProgramarMantencionCreate, db: Session = Depends(get_db)):
-    programacion = crud.actualizar_programacion(db, id, datos)
+    try:
+        programacion = crud.actualizar_programacion(db, id, datos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not programacion:
         raise HTTPException(status_code=404, detail="Programación no encontrada")
     return programacion
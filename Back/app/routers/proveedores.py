@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from app import crud, schemas
+from app.cache import no_modificado
 from app.database import get_db
+from app.paginacion import ParametrosPagina, respuesta_paginada
 
 router = APIRouter(prefix="/proveedores", tags=["Proveedores"])
 
 @router.get("/", response_model=List[schemas.ProveedorOut])
-def api_listar_proveedores(db: Session = Depends(get_db)):
+def api_listar_proveedores(request: Request, response: Response, pagina: ParametrosPagina = Depends(), db: Session = Depends(get_db)):
     try:
-        return crud.obtener_proveedores(db)
+        entrada = crud.obtener_proveedores(db, **pagina.dict())
+        proveedores, siguiente = entrada.valor
+        return no_modificado(request, entrada.etag) or respuesta_paginada(
+            response, proveedores, siguiente, pagina.campos, {"ETag": entrada.etag}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback; traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error interno: {e}")
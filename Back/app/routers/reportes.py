@@ -1,65 +1,120 @@
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
-from app import crud, schemas
+from app import crud, exportacion, graficos, schemas, trabajos
+from app.cache import etag_coincide
 from app.database import get_db
-import pandas as pd
-import matplotlib.pyplot as plt
-import io
 
 router = APIRouter(prefix="/reportes", tags=["Reportes"])
 
+TIPOS_EXPORTACION = {
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", exportacion.stream_xlsx),
+    "csv": ("text/csv; charset=utf-8", exportacion.stream_csv),
+}
+
 @router.post("/", response_model=List[schemas.MantencionReporte])
 def generar_reporte(
     filtros: schemas.ReporteFiltros,
+    request: Request,
     exportar_excel: Optional[bool] = Query(False),
+    exportar: Optional[Literal["xlsx", "csv"]] = Query(None, description="Exporta el reporte en streaming"),
     generar_grafico: Optional[bool] = Query(False),
     db: Session = Depends(get_db),
 ):
-    data = crud.generar_reporte_mantenciones(
-        db,
-        fecha_desde=filtros.fecha_desde,
-        fecha_hasta=filtros.fecha_hasta,
-        patente=filtros.patente,
-        tipo_mantencion=filtros.tipo_mantencion,
-        proveedor=filtros.proveedor,
-    )
+    if generar_grafico:
+        # La suma por tipo la resuelve Postgres con GROUP BY
+        totales = crud.agregar_reporte_mantenciones(db, "tipo", **filtros.model_dump())
+        if not totales:
+            return JSONResponse(content={"detail": "No hay datos para graficar"}, status_code=404)
 
-    # Convertimos a lista de dicts
-    data_dicts = [d.dict() for d in data]
+        clave = graficos.clave_grafico(filtros.model_dump(), totales)
+        headers = {"ETag": f'"{clave}"', "Cache-Control": "private, no-cache"}
+        if etag_coincide(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        # El render corre en el pool de procesos; los gráficos repetidos salen del cache
+        png = graficos.costos_por_tipo(clave, totales)
+        return Response(content=png, media_type="image/png", headers=headers)
 
-    if exportar_excel:
-        df = pd.DataFrame(data_dicts)
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            df.to_excel(writer, index=False, sheet_name="Reporte")
-        output.seek(0)
-        filename = f"reporte_mantenciones_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    if exportar_excel and not exportar:
+        exportar = "xlsx"
+    if exportar:
+        media_type, generar = TIPOS_EXPORTACION[exportar]
+        filename = f"reporte_mantenciones_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{exportar}"
         return StreamingResponse(
-            output,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            generar(filtros),
+            media_type=media_type,
             headers={"Content-Disposition": f'attachment; filename="{filename}"'}
         )
 
-    if generar_grafico:
-        df = pd.DataFrame(data_dicts)
-        if df.empty:
-            return JSONResponse(content={"detail": "No hay datos para graficar"}, status_code=404)
-        grouped = df.groupby("tipoMantencion")["costo"].sum()
-        plt.figure(figsize=(8, 6))
-        grouped.plot(kind="bar", color="skyblue")
-        plt.title("Costos por Tipo de Mantención")
-        plt.ylabel("Costo Total")
-        plt.xlabel("Tipo de Mantención")
-        plt.tight_layout()
+    # Filas Core directo a orjson; el response_model queda para el contrato de OpenAPI
+    return crud.FILAS["reporte"].respuesta(crud.generar_reporte_mantenciones(db, **filtros.model_dump()))
+
+@router.post("/resumen", response_model=List[schemas.ReporteAgregado])
+def resumir_reporte(
+    filtros: schemas.ReporteFiltros,
+    agrupar_por: Literal["tipo", "proveedor", "vehiculo", "mes"] = Query("tipo"),
+    db: Session = Depends(get_db),
+):
+    try:
+        return crud.agregar_reporte_mantenciones(db, agrupar_por, **filtros.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        img_bytes = io.BytesIO()
-        plt.savefig(img_bytes, format="png")
-        plt.close()
-        img_bytes.seek(0)
+@router.post("/resumen/reconstruir")
+def reconstruir_resumen(db: Session = Depends(get_db)):
+    # Recalcula resumen_mensual_costos completo desde mantenciones
+    return {"filas": crud.reconstruir_resumen_mensual(db)}
 
-        return StreamingResponse(img_bytes, media_type="image/png")
+@router.post("/analytics", response_model=schemas.AnaliticaFlota)
+def analizar_flota(
+    filtros: schemas.ReporteFiltros,
+    ventana: int = Query(3, ge=1, le=24, description="Meses del promedio móvil de gasto"),
+    umbral: float = Query(3.5, gt=0, description="Puntaje robusto a partir del cual un costo es atípico"),
+    limite_atipicas: int = Query(100, ge=0, le=1000),
+    db: Session = Depends(get_db),
+):
+    # numpy se carga con el primer pedido, no al arrancar
+    from app import analitica
+
+    filas, patentes, proveedores = crud.datos_analitica(db, **filtros.model_dump())
+    return analitica.analizar(filas, patentes, proveedores, ventana, umbral, limite_atipicas)
+
+# --- Trabajos en segundo plano ---
 
-    return data
+@router.post("/trabajos", response_model=schemas.TrabajoReporte, status_code=202)
+def encolar_reporte(
+    filtros: schemas.ReporteFiltros,
+    response: Response,
+    formato: Literal["xlsx", "csv", "png"] = Query("xlsx"),
+):
+    # Pedidos idénticos mientras el primero sigue en curso reciben el mismo id
+    try:
+        trabajo = trabajos.encolar(formato, filtros)
+    except trabajos.ColaLlena as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    response.headers["Location"] = f"/reportes/trabajos/{trabajo.id}"
+    return trabajo.esquema()
+
+@router.get("/trabajos/{id}", response_model=schemas.TrabajoReporte)
+def estado_reporte(id: str):
+    trabajo = trabajos.obtener(id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    return trabajo.esquema()
+
+@router.get("/trabajos/{id}/descarga")
+def descargar_reporte(id: str):
+    trabajo = trabajos.obtener(id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    if trabajo.estado == trabajos.ERROR:
+        raise HTTPException(status_code=422, detail=trabajo.error)
+    if trabajo.estado != trabajos.LISTO:
+        raise HTTPException(status_code=409, detail="El reporte todavía se está generando")
+    return FileResponse(
+        trabajo.ruta,
+        media_type=trabajos.FORMATOS[trabajo.formato],
+        filename=f"reporte_mantenciones_{datetime.fromtimestamp(trabajo.terminado).strftime('%Y%m%d_%H%M%S')}.{trabajo.formato}",
+    )
@@ -1,21 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
-from app import crud, schemas
+from typing import List, Optional
+from app import crud, importacion, schemas
 from app.database import get_db
+from app.paginacion import HEADER_CURSOR, LIMITE_MAXIMO, ParametrosPagina, respuesta_paginada
+from app.serializacion import respuesta_json
 
 router = APIRouter(prefix="/vehiculos", tags=["Vehículos"])
 
 @router.post("/", response_model=schemas.Vehiculo)
 def crear_vehiculo(vehiculo: schemas.VehiculoCreate, db: Session = Depends(get_db)):
-    db_vehiculo = crud.get_vehiculo_por_patente(db, vehiculo.patente)
-    if db_vehiculo:
-        raise HTTPException(status_code=400, detail="La patente ya existe.")
-    return crud.crear_vehiculo(db, vehiculo)
+    try:
+        return crud.crear_vehiculo(db, vehiculo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/bulk", response_model=schemas.ResultadoImportacion, openapi_extra=importacion.CUERPO_OPENAPI)
+async def importar_vehiculos(request: Request, db: Session = Depends(get_db)):
+    formato = importacion.formato_desde_content_type(request.headers.get("content-type"))
+    if not formato:
+        raise HTTPException(status_code=415, detail="Formato no soportado: use text/csv o application/x-ndjson.")
+    archivo = await importacion.recibir_cuerpo(request)
+    try:
+        return await run_in_threadpool(importacion.importar_vehiculos, db, archivo, formato)
+    finally:
+        archivo.close()
+
+@router.patch("/kilometraje", response_model=List[schemas.ResultadoKilometraje])
+def actualizar_kilometrajes(
+    lecturas: List[schemas.LecturaKilometraje],
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: Session = Depends(get_db),
+):
+    # El odómetro solo avanza; reintentos con la misma Idempotency-Key devuelven la respuesta guardada
+    if not lecturas:
+        raise HTTPException(status_code=400, detail="Debe enviar al menos una lectura.")
+    try:
+        resultados, repetida = crud.actualizar_kilometrajes(db, lecturas, idempotency_key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if repetida:
+        response.headers["Idempotent-Replayed"] = "true"
+    return resultados
 
 @router.get("/", response_model=List[schemas.Vehiculo])
-def listar_vehiculos(db: Session = Depends(get_db)):
-    return crud.obtener_vehiculos(db)
+def listar_vehiculos(response: Response, pagina: ParametrosPagina = Depends(), db: Session = Depends(get_db)):
+    try:
+        vehiculos, siguiente = crud.obtener_vehiculos(db, **pagina.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return respuesta_paginada(response, vehiculos, siguiente, pagina.campos)
 
 @router.get("/{patente}", response_model=schemas.Vehiculo)
 def obtener_vehiculo_por_patente(patente: str, db: Session = Depends(get_db)):
@@ -24,9 +60,29 @@ def obtener_vehiculo_por_patente(patente: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Vehículo no encontrado.")
     return vehiculo
 
+@router.get("/{patente}/resumen", response_model=schemas.ResumenVehiculo)
+def obtener_resumen_vehiculo(
+    patente: str,
+    cursor: Optional[str] = Query(None, description="Cursor del historial devuelto en X-Next-Cursor"),
+    limite: int = Query(20, alias="limit", ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db),
+):
+    # Vehículo, totales, programaciones con su vencimiento y una página del historial
+    try:
+        resultado = crud.obtener_resumen_vehiculo(db, patente, cursor, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Vehículo no encontrado.")
+    resumen, siguiente = resultado
+    return respuesta_json(resumen, {HEADER_CURSOR: siguiente} if siguiente else None)
+
 @router.put("/{id}", response_model=schemas.Vehiculo)
 def actualizar_vehiculo(id: int, datos: schemas.VehiculoCreate, db: Session = Depends(get_db)):
-    actualizado = crud.actualizar_vehiculo(db, id, datos)
+    try:
+        actualizado = crud.actualizar_vehiculo(db, id, datos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not actualizado:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado.")
     return actualizado
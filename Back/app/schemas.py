@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import date
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import date, datetime
 
 # --- Dirección ---
 
@@ -34,6 +34,55 @@ class Vehiculo(VehiculoBase):
     class Config:
         from_attributes = True
 
+class LecturaKilometraje(BaseModel):
+    patente: str
+    kilometraje: int = Field(ge=0)
+    ts: datetime
+
+class ResultadoKilometraje(BaseModel):
+    patente: str
+    estado: Literal["actualizado", "sin_cambio", "no_encontrado"]
+    kilometraje: Optional[int] = None
+
+class TotalesVehiculo(BaseModel):
+    mantenciones: int
+    costo_total: float
+    mantenciones_anio: int
+    costo_anio: float
+    ultima_fecha: Optional[date] = None
+
+class HistorialMantencion(BaseModel):
+    id: int
+    fecha: date
+    tipo_id: Optional[int] = None
+    tipoMantencion: Optional[str] = None
+    proveedor_id: Optional[int] = None
+    proveedor: Optional[str] = None
+    descripcion: Optional[str] = None
+    kilometraje: Optional[int] = None
+    costo: Optional[float] = None
+
+class ProgramacionVehiculo(BaseModel):
+    id: int
+    tipo_id: Optional[int] = None
+    tipoMantencion: Optional[str] = None
+    frecuencia_km: Optional[int] = None
+    frecuencia_meses: Optional[int] = None
+    ultima_fecha: Optional[date] = None
+    ultima_kilometraje: Optional[int] = None
+    siguiente_fecha_estimada: Optional[date] = None
+    siguiente_kilometraje_estimado: Optional[int] = None
+    km_restantes: Optional[int] = None
+    dias_restantes: Optional[int] = None
+    vencida: bool
+
+class ResumenVehiculo(BaseModel):
+    vehiculo: Vehiculo
+    totales: TotalesVehiculo
+    programaciones: List[ProgramacionVehiculo]
+    historial: List[HistorialMantencion]
+    historial_siguiente: Optional[str] = None
+
 # --- Proveedor ---
 
 class ProveedorBase(BaseModel):
@@ -107,6 +156,19 @@ class ProgramarMantencion(ProgramarMantencionBase):
     class Config:
         from_attributes = True
 
+class ProgramacionProxima(BaseModel):
+    id: int
+    vehiculo_id: int
+    patente: str
+    tipo_id: int
+    tipoMantencion: str
+    siguiente_fecha_estimada: Optional[date]
+    siguiente_kilometraje_estimado: Optional[int]
+    kilometraje_actual: Optional[int]
+    km_restantes: Optional[int]
+    dias_restantes: Optional[int]
+    vencida: bool
+
 # --- Reportes ---
 
 class MantencionReporte(BaseModel):
@@ -126,3 +188,85 @@ class ReporteFiltros(BaseModel):
     patente: Optional[str] = None
     tipo_mantencion: Optional[str] = None
     proveedor: Optional[str] = None
+
+class ReporteAgregado(BaseModel):
+    clave: str
+    costo_total: float
+    cantidad: int
+
+    class Config:
+        from_attributes = True
+
+class AnaliticaVehiculo(BaseModel):
+    vehiculo_id: int
+    patente: Optional[str] = None
+    mantenciones: int
+    costo_total: float
+    km_recorridos: Optional[int] = None
+    costo_por_km: Optional[float] = None
+    km_entre_mantenciones: Optional[float] = None
+    dias_entre_mantenciones: Optional[float] = None
+    gasto_mensual: float
+    atipicas: int
+
+class AnaliticaProveedor(BaseModel):
+    proveedor_id: Optional[int] = None
+    nombre: str
+    mantenciones: int
+    costo_total: float
+    costo_promedio: float
+    atipicas: int
+
+class GastoMensual(BaseModel):
+    mes: str
+    costo_total: float
+    cantidad: int
+    promedio_movil: float
+
+class MantencionAtipica(BaseModel):
+    id: int
+    vehiculo_id: int
+    proveedor_id: Optional[int] = None
+    tipo_id: int
+    fecha: date
+    costo: float
+    puntaje: float
+
+class AnaliticaFlota(BaseModel):
+    mantenciones: int
+    vehiculos: List[AnaliticaVehiculo]
+    proveedores: List[AnaliticaProveedor]
+    meses: List[GastoMensual]
+    atipicas: List[MantencionAtipica]
+
+class TrabajoReporte(BaseModel):
+    id: str
+    formato: str
+    estado: str
+    creado: datetime
+    terminado: Optional[datetime] = None
+    tamano: Optional[int] = None
+    error: Optional[str] = None
+    descarga: Optional[str] = None
+
+
+# --- Búsqueda ---
+
+class ResultadoBusqueda(BaseModel):
+    tipo: str
+    id: int
+    titulo: str
+    detalle: Optional[str] = None
+    fecha: Optional[date] = None
+    puntaje: float
+
+
+# --- Importación masiva ---
+
+class ErrorImportacion(BaseModel):
+    fila: int
+    error: str
+
+class ResultadoImportacion(BaseModel):
+    insertados: int
+    errores: List[ErrorImportacion]
@@ -0,0 +1,104 @@
+import typing
+from decimal import Decimal
+from operator import itemgetter
+from typing import Any, List, Optional, Sequence, Type
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import select
+
+# Lecturas grandes sin validar cada fila con pydantic: las filas Core (tuplas) pasan a dicts con las
+# claves del schema y orjson las escribe directo a bytes. Las rutas conservan su response_model, así
+# que el contrato de OpenAPI no cambia; solo se salta la validación y serialización de FastAPI
+
+
+def _por_defecto(valor):
+    # Postgres devuelve numeric como Decimal; el resto de los tipos los resuelve orjson
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+def respuesta_json(datos: Any, headers: Optional[dict] = None, status_code: int = 200) -> Response:
+    return Response(
+        content=orjson.dumps(datos, default=_por_defecto),
+        media_type="application/json",
+        headers=headers,
+        status_code=status_code,
+    )
+
+def _submodelo(anotacion) -> Optional[Type[BaseModel]]:
+    # Optional[DireccionOut] -> DireccionOut
+    for tipo in (anotacion, *typing.get_args(anotacion)):
+        if isinstance(tipo, type) and issubclass(tipo, BaseModel):
+            return tipo
+    return None
+
+def _es_float(anotacion) -> bool:
+    return anotacion is float or float in typing.get_args(anotacion)
+
+
+class Serializador:
+    # Se arma una vez por schema: orden de los campos, cuáles son float (pydantic convierte los int
+    # que llegan de la base y acá se hace lo mismo) y los modelos anidados, que se leen con un
+    # outer join como columnas planas al final de la fila
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        self.claves: List[str] = []
+        self.anidados: List[tuple] = []
+        for nombre, campo in schema.model_fields.items():
+            sub = _submodelo(campo.annotation)
+            if sub is not None:
+                self.anidados.append((nombre, Serializador(sub)))
+            else:
+                self.claves.append(nombre)
+        self.flotantes = [c for c in self.claves if _es_float(schema.model_fields[c].annotation)]
+        self.ancho = len(self.claves) + sum(sub.ancho for _, sub in self.anidados)
+
+    def columnas(self, modelo) -> list:
+        columnas = [getattr(modelo, c) for c in self.claves]
+        for nombre, sub in self.anidados:
+            columnas.extend(sub.columnas(getattr(modelo, nombre).property.mapper.class_))
+        return columnas
+
+    def consulta(self, modelo):
+        # Las columnas van en el orden que espera armar(); los anidados con LEFT JOIN por la relación
+        stmt = select(*self.columnas(modelo)).select_from(modelo)
+        for nombre, _ in self.anidados:
+            stmt = stmt.outerjoin(getattr(modelo, nombre))
+        return stmt
+
+    def armar(self, fila: Sequence) -> dict:
+        datos = dict(zip(self.claves, fila))
+        for clave in self.flotantes:
+            if datos[clave] is not None:
+                datos[clave] = float(datos[clave])
+        inicio = len(self.claves)
+        for nombre, sub in self.anidados:
+            parte = fila[inicio:inicio + sub.ancho]
+            inicio += sub.ancho
+            datos[nombre] = None if all(v is None for v in parte) else sub.armar(parte)
+        return datos
+
+    def filas(self, filas: Sequence) -> List[dict]:
+        if not filas:
+            return []
+        # Filas con nombres (consultas con label) en otro orden: se reordenan una vez por llamada
+        campos = getattr(filas[0], "_fields", None)
+        if not self.anidados and campos and tuple(campos[:len(self.claves)]) != tuple(self.claves):
+            ordenar = itemgetter(*[campos.index(c) for c in self.claves])
+            filas = [ordenar(f) if len(self.claves) > 1 else (ordenar(f),) for f in filas]
+        if not self.flotantes and not self.anidados:
+            return [dict(zip(self.claves, f)) for f in filas]
+        return [self.armar(f) for f in filas]
+
+    def proyectar(self, filas: List[dict]) -> List[dict]:
+        # Filas de ?fields= (solo algunas columnas): los mismos tipos que filas() para esas columnas
+        flotantes = [c for c in self.flotantes if filas and c in filas[0]]
+        for fila in filas:
+            for clave in flotantes:
+                if fila[clave] is not None:
+                    fila[clave] = float(fila[clave])
+        return filas
+
+    def respuesta(self, filas: Sequence, headers: Optional[dict] = None) -> Response:
+        return respuesta_json(self.filas(filas), headers)
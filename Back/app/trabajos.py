@@ -0,0 +1,266 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+from app import exportacion, schemas
+from app.config import app_config
+
+# Exportaciones largas fuera del request: el cliente recibe un id, consulta el estado y descarga
+# el archivo cuando está listo. El estado de cada trabajo se guarda en <id>.json junto al archivo,
+# así cualquier worker que comparta trabajos_dir responde la consulta y la descarga; el worker que
+# lo encoló lo tiene además en memoria con su Future
+
+TRABAJOS_WORKERS = app_config.trabajos_workers
+TRABAJOS_MAX_PENDIENTES = app_config.trabajos_max_pendientes
+TRABAJOS_RETENCION_S = app_config.trabajos_retencion_s
+TRABAJOS_DIR = app_config.trabajos_dir
+TRABAJOS_ESPERA_CIERRE_S = app_config.trabajos_espera_cierre_s
+# Cada cuánto se borran los archivos vencidos aunque no lleguen requests
+INTERVALO_PURGA_S = min(60, TRABAJOS_RETENCION_S)
+
+FORMATOS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "png": "image/png",
+}
+
+PENDIENTE, EN_PROCESO, LISTO, ERROR = "pendiente", "en_proceso", "listo", "error"
+ID_VALIDO = re.compile(r"[0-9a-f]{32}")
+
+
+class ColaLlena(Exception):
+    pass
+
+
+@dataclass
+class Trabajo:
+    id: str
+    clave: str
+    formato: str
+    ruta: str
+    creado: float
+    estado: str = PENDIENTE
+    terminado: Optional[float] = None
+    tamano: Optional[int] = None
+    error: Optional[str] = None
+    futuro: Optional[Future] = None
+
+    def estado_actual(self) -> str:
+        if self.estado == PENDIENTE:
+            # Sin Future es un trabajo de otro worker: el archivo parcial indica que ya empezó
+            en_proceso = self.futuro.running() if self.futuro is not None else os.path.exists(f"{self.ruta}.parcial")
+            if en_proceso:
+                return EN_PROCESO
+        return self.estado
+
+    def esquema(self) -> schemas.TrabajoReporte:
+        return schemas.TrabajoReporte(
+            id=self.id,
+            formato=self.formato,
+            estado=self.estado_actual(),
+            creado=datetime.fromtimestamp(self.creado),
+            terminado=datetime.fromtimestamp(self.terminado) if self.terminado else None,
+            tamano=self.tamano,
+            error=self.error,
+            descarga=f"/reportes/trabajos/{self.id}/descarga" if self.estado == LISTO else None,
+        )
+
+
+_trabajos: Dict[str, Trabajo] = {}
+# clave de contenido -> id del trabajo que la está generando
+_en_curso: Dict[str, str] = {}
+_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+_purgador: Optional[threading.Thread] = None
+_detener = threading.Event()
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _limpiar_directorio(time.time())
+        # spawn, igual que app.graficos: el proceso hijo abre sus propias conexiones
+        _executor = ProcessPoolExecutor(
+            max_workers=TRABAJOS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def _purgar_periodicamente():
+    while not _detener.wait(INTERVALO_PURGA_S):
+        ahora = time.time()
+        with _lock:
+            _purgar(ahora)
+        _limpiar_directorio(ahora)
+
+def iniciar():
+    global _purgador
+    if _purgador is not None:
+        return
+    _limpiar_directorio(time.time())
+    _limpiar_parciales()
+    _detener.clear()
+    _purgador = threading.Thread(target=_purgar_periodicamente, name="trabajos-purga", daemon=True)
+    _purgador.start()
+
+def cerrar():
+    global _executor, _purgador
+    _detener.set()
+    if _purgador is not None:
+        _purgador.join(timeout=5)
+        _purgador = None
+    with _lock:
+        executor, _executor = _executor, None
+        propios = list(_trabajos.values())
+    if executor is not None:
+        # Fuera del lock: cancelar los pendientes llama a _al_terminar, que lo toma
+        executor.shutdown(wait=False, cancel_futures=True)
+        # No sirve concurrent.futures.wait: un Future cancelado por shutdown nunca cuenta como terminado
+        futuros = [t.futuro for t in propios if t.futuro is not None]
+        limite = time.monotonic() + TRABAJOS_ESPERA_CIERRE_S
+        while not all(f.done() for f in futuros) and time.monotonic() < limite:
+            time.sleep(0.1)
+        if all(f.done() for f in futuros):
+            executor.shutdown(wait=True)
+    with _lock:
+        for trabajo in propios:
+            if trabajo.futuro is not None and not trabajo.futuro.done():
+                # Sigue corriendo tras la espera: queda como error y su parcial se borra abajo
+                trabajo.estado, trabajo.error = ERROR, "Interrumpido al detener el servidor"
+                trabajo.terminado = time.time()
+                _guardar(trabajo)
+        # Los reportes terminados siguen disponibles para los otros workers (y tras reiniciar)
+        # hasta que venzan
+        _trabajos.clear()
+        _en_curso.clear()
+    _limpiar_parciales()
+
+def _ruta_estado(id: str) -> str:
+    return os.path.join(TRABAJOS_DIR, f"{id}.json")
+
+def _guardar(trabajo: Trabajo):
+    datos = {
+        "id": trabajo.id, "clave": trabajo.clave, "formato": trabajo.formato, "creado": trabajo.creado,
+        "estado": trabajo.estado, "terminado": trabajo.terminado, "tamano": trabajo.tamano, "error": trabajo.error,
+    }
+    # Se escribe aparte y se renombra: otro worker nunca lee un JSON a medias
+    temporal = f"{_ruta_estado(trabajo.id)}.{os.getpid()}.tmp"
+    with open(temporal, "w") as archivo:
+        json.dump(datos, archivo)
+    os.replace(temporal, _ruta_estado(trabajo.id))
+
+def _leer(id: str) -> Optional[Trabajo]:
+    # Trabajos encolados por otro worker del servidor
+    if not ID_VALIDO.fullmatch(id):
+        return None
+    try:
+        with open(_ruta_estado(id)) as archivo:
+            datos = json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return None
+    if datos.get("formato") not in FORMATOS:
+        return None
+    trabajo = Trabajo(ruta=os.path.join(TRABAJOS_DIR, f"{id}.{datos['formato']}"), **datos)
+    if trabajo.terminado and time.time() - trabajo.terminado > TRABAJOS_RETENCION_S:
+        return None
+    return trabajo
+
+def _clave(formato: str, filtros: dict) -> str:
+    return hashlib.sha256(json.dumps([formato, filtros], sort_keys=True, default=str).encode()).hexdigest()
+
+def _purgar(ahora: float):
+    # Se llama con el lock tomado; los trabajos terminados expiran junto con su archivo
+    for trabajo in list(_trabajos.values()):
+        if trabajo.terminado and ahora - trabajo.terminado > TRABAJOS_RETENCION_S:
+            del _trabajos[trabajo.id]
+            _borrar(trabajo.ruta)
+            _borrar(_ruta_estado(trabajo.id))
+
+def _borrar(ruta: str):
+    # Otro worker del servidor puede haberlo borrado ya
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+def _limpiar_directorio(ahora: float):
+    # Archivos vencidos de cualquier worker, o de una ejecución anterior del servidor
+    if not os.path.isdir(TRABAJOS_DIR):
+        return
+    for nombre in os.listdir(TRABAJOS_DIR):
+        ruta = os.path.join(TRABAJOS_DIR, nombre)
+        try:
+            vencido = ahora - os.path.getmtime(ruta) > TRABAJOS_RETENCION_S
+        except FileNotFoundError:
+            continue
+        if vencido:
+            _borrar(ruta)
+
+def _limpiar_parciales():
+    # Archivos .parcial cuyo trabajo ya no está pendiente en ningún worker (terminó, se interrumpió
+    # o su estado ya no existe). Los de trabajos pendientes de otros workers se dejan
+    if not os.path.isdir(TRABAJOS_DIR):
+        return
+    for nombre in os.listdir(TRABAJOS_DIR):
+        if not nombre.endswith(".parcial"):
+            continue
+        trabajo = _leer(nombre.split(".", 1)[0])
+        if trabajo is None or trabajo.estado != PENDIENTE:
+            _borrar(os.path.join(TRABAJOS_DIR, nombre))
+
+def _al_terminar(trabajo: Trabajo, futuro: Future):
+    with _lock:
+        _en_curso.pop(trabajo.clave, None)
+        trabajo.terminado = time.time()
+        if futuro.cancelled():
+            trabajo.estado, trabajo.error = ERROR, "Cancelado al detener el servidor"
+        else:
+            try:
+                trabajo.tamano = futuro.result()
+                # Pudo terminar después de que cerrar() lo diera por interrumpido
+                trabajo.estado, trabajo.error = LISTO, None
+            except Exception as e:
+                trabajo.estado = ERROR
+                trabajo.error = str(e) or type(e).__name__
+        _guardar(trabajo)
+
+def encolar(formato: str, filtros: schemas.ReporteFiltros) -> Trabajo:
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+    datos = filtros.model_dump(mode="json")
+    clave = _clave(formato, datos)
+
+    with _lock:
+        ahora = time.time()
+        _purgar(ahora)
+        # Un pedido idéntico a uno que todavía se está generando en este worker recibe el mismo trabajo
+        if clave in _en_curso:
+            return _trabajos[_en_curso[clave]]
+        if len(_en_curso) >= TRABAJOS_MAX_PENDIENTES:
+            raise ColaLlena("Hay demasiados reportes en cola, intente más tarde.")
+
+        os.makedirs(TRABAJOS_DIR, exist_ok=True)
+        id = uuid.uuid4().hex
+        trabajo = Trabajo(
+            id=id, clave=clave, formato=formato, ruta=os.path.join(TRABAJOS_DIR, f"{id}.{formato}"), creado=ahora
+        )
+        _guardar(trabajo)
+        trabajo.futuro = _pool().submit(exportacion.exportar_a_archivo, formato, datos, trabajo.ruta)
+        _trabajos[id] = trabajo
+        _en_curso[clave] = id
+
+    trabajo.futuro.add_done_callback(lambda f: _al_terminar(trabajo, f))
+    return trabajo
+
+def obtener(id: str) -> Optional[Trabajo]:
+    with _lock:
+        _purgar(time.time())
+        trabajo = _trabajos.get(id)
+    return trabajo if trabajo is not None else _leer(id)
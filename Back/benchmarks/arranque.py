@@ -0,0 +1,72 @@
+"""Presupuesto de arranque de la API.
+
+Importa app.main en un proceso limpio con -X importtime y falla (código 1) si el import tarda
+más que el presupuesto o si deja cargada alguna librería que solo usan los reportes.
+
+Uso (desde Back/):
+    python benchmarks/arranque.py
+    python benchmarks/arranque.py --presupuesto-ms 800 --top 15
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Se cargan recién al exportar o graficar; ninguna debe aparecer al arrancar
+MODULOS_DIFERIDOS = ("pandas", "numpy", "matplotlib", "xlsxwriter", "openpyxl", "PIL", "redis")
+
+SCRIPT = (
+    "import sys, json, app.main; "
+    f"print(json.dumps(sorted(m for m in {MODULOS_DIFERIDOS!r} if m in sys.modules)))"
+)
+
+
+def medir() -> tuple:
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT], cwd=RAIZ, capture_output=True, text=True
+    )
+    if proceso.returncode != 0:
+        raise SystemExit(proceso.stderr)
+
+    # Cada línea: "import time: <propio us> | <acumulado us> | <módulo>"
+    tiempos = []
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, modulo = linea[len("import time:"):].split("|")
+        tiempos.append((modulo.strip(), int(propio), int(acumulado), len(modulo) - len(modulo.lstrip())))
+    total = next(acumulado for modulo, _, acumulado, _ in tiempos if modulo == "app.main")
+    return total / 1000, tiempos, json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--presupuesto-ms", type=float, default=1500)
+    parser.add_argument("--repeticiones", type=int, default=3, help="Se toma la mejor medición")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    total_ms, tiempos, cargados = min((medir() for _ in range(args.repeticiones)), key=lambda m: m[0])
+
+    print(f"import app.main: {total_ms:.0f} ms (presupuesto {args.presupuesto_ms:.0f} ms)")
+    print("\nImports directos más lentos:")
+    # La sangría indica la profundidad: 3 espacios son los imports que hace app.main
+    primer_nivel = [t for t in tiempos if t[3] == 3]
+    for modulo, _, acumulado, _ in sorted(primer_nivel, key=lambda t: -t[2])[: args.top]:
+        print(f"  {acumulado / 1000:8.1f} ms  {modulo}")
+
+    fallas = []
+    if total_ms > args.presupuesto_ms:
+        fallas.append(f"el arranque tarda {total_ms:.0f} ms, sobre el presupuesto de {args.presupuesto_ms:.0f} ms")
+    if cargados:
+        fallas.append(f"se cargan al arrancar módulos que deberían ser diferidos: {', '.join(cargados)}")
+    for falla in fallas:
+        print(f"\nFALLA: {falla}")
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
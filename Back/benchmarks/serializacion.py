@@ -0,0 +1,143 @@
+"""Serialización de lecturas: camino anterior contra app.serializacion.
+
+Para cada listado mide, sobre una base SQLite en memoria con datos sintéticos, el tiempo de la
+consulta más la serialización a bytes JSON por dos caminos:
+  anterior  entidades ORM validadas con el schema de pydantic y json.dumps, como hace FastAPI
+            con response_model
+  rápido    filas Core con las columnas del schema, Serializador.filas y orjson
+Verifica además que ambos produzcan el mismo JSON.
+
+Uso (desde Back/):
+    python benchmarks/serializacion.py
+    python benchmarks/serializacion.py --filas 50000 --repeticiones 10
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=20_000, help="Filas por listado")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Se informa la mediana")
+    return parser.parse_args()
+
+
+def sembrar(db, models, filas: int):
+    from sqlalchemy import insert
+
+    proveedores = max(filas // 100, 1)
+    db.execute(insert(models.Direccion), [
+        {"id": i, "calle": f"Calle {i}", "comuna": "Santiago", "region": "RM"} for i in range(1, proveedores + 1)
+    ])
+    db.execute(insert(models.Proveedor), [
+        {"id": i, "nombre": f"Proveedor {i}", "telefono": "+56 9 0000 0000", "email": f"p{i}@ejemplo.cl",
+         "direccion_id": i if i % 4 else None}
+        for i in range(1, proveedores + 1)
+    ])
+    db.execute(insert(models.TipoMantencion), [{"id": i, "nombre": f"Tipo {i}"} for i in range(1, 13)])
+    db.execute(insert(models.Vehiculo), [
+        {"id": i, "patente": f"PT{i:06d}", "marca": "Marca", "modelo": f"Modelo {i % 40}", "anio": 2010 + i % 15,
+         "kilometraje": i * 7}
+        for i in range(1, filas + 1)
+    ])
+    inicio = date(2020, 1, 1)
+    db.execute(insert(models.Mantencion), [
+        {"id": i, "vehiculo_id": i % filas + 1, "tipo_id": i % 12 + 1, "descripcion": f"Servicio {i}",
+         "fecha": inicio + timedelta(days=i % 1500), "kilometraje": i * 3, "costo": 10_000 + i % 500_000,
+         "proveedor_id": i % proveedores + 1}
+        for i in range(1, filas + 1)
+    ])
+    db.commit()
+
+
+def casos(models, schemas, crud):
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+
+    # nombre: (schema, consulta del camino anterior, filas del camino rápido)
+    return {
+        "vehiculos": (
+            schemas.Vehiculo,
+            lambda db: db.execute(select(models.Vehiculo)).scalars().all(),
+            lambda db: db.execute(crud.FILAS["vehiculos"].consulta(models.Vehiculo)).all(),
+        ),
+        "mantenciones": (
+            schemas.MantencionBase,
+            lambda db: db.execute(select(models.Mantencion)).scalars().all(),
+            lambda db: db.execute(crud.FILAS["mantenciones"].consulta(models.Mantencion)).all(),
+        ),
+        "proveedores": (
+            schemas.ProveedorOut,
+            lambda db: db.execute(
+                select(models.Proveedor).options(joinedload(models.Proveedor.direccion))
+            ).scalars().all(),
+            lambda db: db.execute(crud.FILAS["proveedores"].consulta(models.Proveedor)).all(),
+        ),
+        "reporte": (
+            schemas.MantencionReporte,
+            lambda db: crud.generar_reporte_mantenciones(db),
+            lambda db: crud.generar_reporte_mantenciones(db),
+        ),
+    }
+
+
+def medir(funcion, repeticiones: int) -> tuple:
+    tiempos, resultado = [], None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000, resultado
+
+
+def main():
+    args = _argumentos()
+    os.environ.setdefault("database_url", "sqlite://")
+    sys.path.insert(0, str(RAIZ))
+
+    from typing import List
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app import crud, models, schemas
+    from app.serializacion import respuesta_json
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    Sesion = sessionmaker(bind=engine)
+    with Sesion() as db:
+        sembrar(db, models, args.filas)
+
+    print(f"{'listado':<14}{'filas':>8}{'anterior':>12}{'rápido':>12}{'factor':>9}")
+    for nombre, (schema, cargar_anterior, cargar_rapido) in casos(models, schemas, crud).items():
+        adaptador = TypeAdapter(List[schema])
+
+        def anterior():
+            # Sesión nueva en cada vuelta: las entidades no se reutilizan del identity map
+            with Sesion() as db:
+                validados = adaptador.validate_python(cargar_anterior(db), from_attributes=True)
+                return json.dumps(adaptador.dump_python(validados, mode="json")).encode()
+
+        def rapido():
+            with Sesion() as db:
+                return respuesta_json(crud.FILAS[nombre].filas(cargar_rapido(db))).body
+
+        ms_anterior, bytes_anterior = medir(anterior, args.repeticiones)
+        ms_rapido, bytes_rapido = medir(rapido, args.repeticiones)
+        if json.loads(bytes_anterior) != json.loads(bytes_rapido):
+            raise SystemExit(f"{nombre}: los dos caminos producen JSON distinto")
+        filas = len(json.loads(bytes_rapido))
+        print(f"{nombre:<14}{filas:>8}{ms_anterior:>10.1f}ms{ms_rapido:>10.1f}ms{ms_anterior / ms_rapido:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import re
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from app.config import db_config
+from app import models
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = models.Base.metadata
+
+# -x url=... permite migrar otra base sin tocar .env
+URL = context.get_x_argument(as_dictionary=True).get("url") or db_config.url
+
+# Lo que existe solo en Postgres y no está en los modelos: las particiones anuales de mantenciones
+# (0002) y los índices GIN de búsqueda (models.INDICES_BUSQUEDA, se crean como DDL)
+PARTICION = re.compile(r"^mantenciones_(\d{4}|default)$")
+
+
+def incluir(objeto, nombre, tipo, reflejado, comparado_con):
+    if tipo == "table" and reflejado and PARTICION.match(nombre):
+        return False
+    if tipo == "index" and reflejado and comparado_con is None and nombre.endswith(("_trgm", "_tsv")):
+        return False
+    return True
+
+
+def migrar_offline():
+    # alembic upgrade head --sql: imprime el SQL sin conectarse
+    context.configure(
+        url=URL, target_metadata=target_metadata, literal_binds=True, include_object=incluir,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def migrar_online():
+    # Sin pool: una conexión directa por corrida (con pgbouncer en modo transacción usar el puerto 5432)
+    engine = create_engine(URL, poolclass=pool.NullPool)
+    with engine.connect() as conexion:
+        context.configure(connection=conexion, target_metadata=target_metadata, include_object=incluir)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    migrar_offline()
+else:
+    migrar_online()
@@ -0,0 +1,141 @@
+"""Esquema inicial: las tablas de app/models.py tal como estaban antes de las migraciones.
+
+En una base que ya tiene estas tablas basta con marcarla: alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Búsqueda de GET /buscar (pg_trgm y tsvector); solo Postgres
+INDICES_BUSQUEDA = [
+    "CREATE INDEX IF NOT EXISTS ix_vehiculos_patente_trgm ON vehiculos USING gin (patente gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_vehiculos_marca_modelo_trgm ON vehiculos "
+    "USING gin ((marca || ' ' || modelo) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_proveedores_nombre_trgm ON proveedores USING gin (nombre gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_mantenciones_descripcion_tsv ON mantenciones "
+    "USING gin (to_tsvector('spanish', coalesce(descripcion, '')))",
+    "CREATE INDEX IF NOT EXISTS ix_mantenciones_descripcion_trgm ON mantenciones "
+    "USING gin (descripcion gin_trgm_ops)",
+]
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == "postgresql"
+    if postgres:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.create_table(
+        "direcciones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("calle", sa.String(), nullable=False),
+        sa.Column("comuna", sa.String(), nullable=False),
+        sa.Column("region", sa.String(), nullable=False),
+    )
+    op.create_index("ix_direcciones_id", "direcciones", ["id"])
+
+    op.create_table(
+        "vehiculos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("patente", sa.String(), nullable=False),
+        sa.Column("marca", sa.String(), nullable=False),
+        sa.Column("modelo", sa.String(), nullable=False),
+        sa.Column("anio", sa.Integer(), nullable=False),
+        sa.Column("kilometraje", sa.Integer()),
+    )
+    op.create_index("ix_vehiculos_id", "vehiculos", ["id"])
+    op.create_index("ix_vehiculos_patente", "vehiculos", ["patente"], unique=True)
+
+    op.create_table(
+        "proveedores",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nombre", sa.String(), nullable=False, unique=True),
+        sa.Column("telefono", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("direccion_id", sa.Integer(), sa.ForeignKey("direcciones.id")),
+    )
+    op.create_index("ix_proveedores_id", "proveedores", ["id"])
+
+    op.create_table(
+        "tipos_mantencion",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nombre", sa.String(), nullable=False),
+    )
+    op.create_index("ix_tipos_mantencion_id", "tipos_mantencion", ["id"])
+
+    op.create_table(
+        "mantenciones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("vehiculo_id", sa.Integer(), sa.ForeignKey("vehiculos.id")),
+        sa.Column("tipo_id", sa.Integer(), sa.ForeignKey("tipos_mantencion.id")),
+        sa.Column("descripcion", sa.Text()),
+        sa.Column("fecha", sa.Date(), nullable=False),
+        sa.Column("kilometraje", sa.Integer()),
+        sa.Column("costo", sa.Integer()),
+        sa.Column("proveedor_id", sa.Integer(), sa.ForeignKey("proveedores.id")),
+    )
+    op.create_index("ix_mantenciones_id", "mantenciones", ["id"])
+    op.create_index(
+        "ix_mantenciones_vehiculo_kilometraje", "mantenciones", ["vehiculo_id", sa.text("kilometraje DESC")]
+    )
+    op.create_index("ix_mantenciones_vehiculo_fecha", "mantenciones", ["vehiculo_id", sa.text("fecha DESC")])
+
+    op.create_table(
+        "programar_mantencion",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("vehiculo_id", sa.Integer(), sa.ForeignKey("vehiculos.id")),
+        sa.Column("tipo_id", sa.Integer(), sa.ForeignKey("tipos_mantencion.id")),
+        sa.Column("frecuencia_km", sa.Integer()),
+        sa.Column("frecuencia_meses", sa.Integer()),
+        sa.Column("ultima_fecha", sa.Date()),
+        sa.Column("ultima_kilometraje", sa.Integer()),
+        sa.Column("siguiente_fecha_estimada", sa.Date()),
+        sa.Column("siguiente_kilometraje_estimado", sa.Integer()),
+    )
+    op.create_index("ix_programar_mantencion_id", "programar_mantencion", ["id"])
+    op.create_index("ix_programar_mantencion_siguiente_fecha", "programar_mantencion", ["siguiente_fecha_estimada"])
+    op.create_index(
+        "ix_programar_mantencion_vehiculo_siguiente_km",
+        "programar_mantencion",
+        ["vehiculo_id", "siguiente_kilometraje_estimado"],
+    )
+
+    op.create_table(
+        "resumen_mensual_costos",
+        sa.Column("mes", sa.Date(), primary_key=True),
+        sa.Column("vehiculo_id", sa.Integer(), primary_key=True),
+        sa.Column("tipo_id", sa.Integer(), primary_key=True),
+        sa.Column("proveedor_id", sa.Integer(), primary_key=True),
+        sa.Column("costo_total", sa.BigInteger(), nullable=False),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.Column("kilometraje_max", sa.Integer()),
+    )
+
+    op.create_table(
+        "claves_idempotencia",
+        sa.Column("endpoint", sa.String(), primary_key=True),
+        sa.Column("clave", sa.String(), primary_key=True),
+        sa.Column("huella", sa.String(64), nullable=False),
+        sa.Column("respuesta", sa.Text(), nullable=False),
+        sa.Column("creado", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_claves_idempotencia_creado", "claves_idempotencia", ["creado"])
+
+    if postgres:
+        for sentencia in INDICES_BUSQUEDA:
+            op.execute(sentencia)
+
+
+def downgrade():
+    for tabla in (
+        "claves_idempotencia", "resumen_mensual_costos", "programar_mantencion", "mantenciones",
+        "tipos_mantencion", "proveedores", "vehiculos", "direcciones",
+    ):
+        op.drop_table(tabla)
@@ -0,0 +1,152 @@
+"""mantenciones particionada por año de fecha, BRIN sobre fecha e índices FK + fecha.
+
+Los reportes filtran por rango de fechas y por vehículo, tipo o proveedor. En Postgres la tabla pasa
+a particionarse por rango anual de fecha, así que un reporte de un período solo lee las
+particiones de esos años. Además cada partición tiene un índice BRIN sobre fecha, que es chico
+porque las mantenciones se insertan casi en orden de fecha, e índices compuestos (FK, fecha) para
+los filtros por tipo y proveedor. En otras bases (SQLite local) solo se crean los índices.
+
+La clave primaria de la tabla particionada es (id, fecha), porque Postgres exige que incluya la
+columna de partición. id sigue saliendo de la misma secuencia.
+
+Las particiones de años futuros las crea crear_particion_mantenciones(anio), que la API llama al
+arrancar (crud.asegurar_particiones_mantenciones). Una fecha fuera de las particiones creadas cae
+en mantenciones_default, y la función mueve esas filas cuando crea el año que les corresponde.
+
+La migración copia la tabla completa: en una base grande conviene correrla en una ventana de
+mantención.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+COLUMNAS = "id, vehiculo_id, tipo_id, descripcion, fecha, kilometraje, costo, proveedor_id"
+
+FUNCION_PARTICION = """
+CREATE OR REPLACE FUNCTION crear_particion_mantenciones(anio integer) RETURNS boolean
+LANGUAGE plpgsql AS $$
+DECLARE
+    nombre text := format('mantenciones_%s', anio);
+    desde date := make_date(anio, 1, 1);
+    hasta date := make_date(anio + 1, 1, 1);
+BEGIN
+    IF to_regclass(nombre) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+    -- Las filas de ese año que hayan caído en la partición por defecto se mueven antes de
+    -- adjuntar; si no, ATTACH falla al validar la partición por defecto
+    EXECUTE format('CREATE TABLE %I (LIKE mantenciones INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', nombre);
+    EXECUTE format(
+        'WITH movidas AS (DELETE FROM mantenciones_default WHERE fecha >= %L AND fecha < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM movidas',
+        desde, hasta, nombre
+    );
+    EXECUTE format('ALTER TABLE mantenciones ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', nombre, desde, hasta);
+    RETURN true;
+END
+$$
+"""
+
+# Desde el primer año con mantenciones (o el actual si la tabla está vacía) hasta el siguiente
+CREAR_PARTICIONES = """
+DO $$
+DECLARE
+    desde integer := coalesce(
+        (SELECT extract(year FROM min(fecha))::integer FROM mantenciones_sin_particion),
+        extract(year FROM current_date)::integer
+    );
+BEGIN
+    FOR anio IN desde .. extract(year FROM current_date)::integer + 1 LOOP
+        PERFORM crear_particion_mantenciones(anio);
+    END LOOP;
+END
+$$
+"""
+
+INDICES_ANTERIORES = [
+    "CREATE INDEX ix_mantenciones_id ON mantenciones (id)",
+    "CREATE INDEX ix_mantenciones_vehiculo_kilometraje ON mantenciones (vehiculo_id, kilometraje DESC)",
+    "CREATE INDEX ix_mantenciones_vehiculo_fecha ON mantenciones (vehiculo_id, fecha DESC)",
+    "CREATE INDEX ix_mantenciones_descripcion_tsv ON mantenciones "
+    "USING gin (to_tsvector('spanish', coalesce(descripcion, '')))",
+    "CREATE INDEX ix_mantenciones_descripcion_trgm ON mantenciones USING gin (descripcion gin_trgm_ops)",
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        op.create_index("ix_mantenciones_fecha", "mantenciones", ["fecha"])
+        op.create_index("ix_mantenciones_tipo_fecha", "mantenciones", ["tipo_id", "fecha"])
+        op.create_index("ix_mantenciones_proveedor_fecha", "mantenciones", ["proveedor_id", "fecha"])
+        return
+
+    # La tabla actual queda con otro nombre hasta copiar sus filas; la secuencia de id pasa a la nueva
+    op.execute("ALTER TABLE mantenciones RENAME TO mantenciones_sin_particion")
+    op.execute("ALTER TABLE mantenciones_sin_particion RENAME CONSTRAINT mantenciones_pkey TO mantenciones_sin_particion_pkey")
+    op.execute("ALTER SEQUENCE mantenciones_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE mantenciones (
+            id integer NOT NULL DEFAULT nextval('mantenciones_id_seq'),
+            vehiculo_id integer REFERENCES vehiculos (id),
+            tipo_id integer REFERENCES tipos_mantencion (id),
+            descripcion text,
+            fecha date NOT NULL,
+            kilometraje integer,
+            costo integer,
+            proveedor_id integer REFERENCES proveedores (id),
+            CONSTRAINT mantenciones_pkey PRIMARY KEY (id, fecha)
+        ) PARTITION BY RANGE (fecha)
+    """)
+    op.execute("CREATE TABLE mantenciones_default PARTITION OF mantenciones DEFAULT")
+    op.execute(FUNCION_PARTICION)
+    op.execute(CREAR_PARTICIONES)
+
+    op.execute(f"INSERT INTO mantenciones ({COLUMNAS}) SELECT {COLUMNAS} FROM mantenciones_sin_particion")
+    op.execute("DROP TABLE mantenciones_sin_particion")
+    op.execute("ALTER SEQUENCE mantenciones_id_seq OWNED BY mantenciones.id")
+
+    # Índices sobre la tabla particionada: Postgres los crea en cada partición, también en las que
+    # se adjunten después
+    for sentencia in INDICES_ANTERIORES:
+        op.execute(sentencia)
+    op.execute("CREATE INDEX ix_mantenciones_fecha ON mantenciones USING brin (fecha)")
+    op.execute("CREATE INDEX ix_mantenciones_tipo_fecha ON mantenciones (tipo_id, fecha)")
+    op.execute("CREATE INDEX ix_mantenciones_proveedor_fecha ON mantenciones (proveedor_id, fecha)")
+    op.execute("ANALYZE mantenciones")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        op.drop_index("ix_mantenciones_proveedor_fecha", "mantenciones")
+        op.drop_index("ix_mantenciones_tipo_fecha", "mantenciones")
+        op.drop_index("ix_mantenciones_fecha", "mantenciones")
+        return
+
+    op.execute("ALTER TABLE mantenciones RENAME TO mantenciones_particionada")
+    op.execute("ALTER TABLE mantenciones_particionada RENAME CONSTRAINT mantenciones_pkey TO mantenciones_particionada_pkey")
+    op.execute("ALTER SEQUENCE mantenciones_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE mantenciones (
+            id integer NOT NULL DEFAULT nextval('mantenciones_id_seq') PRIMARY KEY,
+            vehiculo_id integer REFERENCES vehiculos (id),
+            tipo_id integer REFERENCES tipos_mantencion (id),
+            descripcion text,
+            fecha date NOT NULL,
+            kilometraje integer,
+            costo integer,
+            proveedor_id integer REFERENCES proveedores (id)
+        )
+    """)
+    op.execute(f"INSERT INTO mantenciones ({COLUMNAS}) SELECT {COLUMNAS} FROM mantenciones_particionada")
+    op.execute("DROP TABLE mantenciones_particionada CASCADE")
+    op.execute("DROP FUNCTION crear_particion_mantenciones(integer)")
+    op.execute("ALTER SEQUENCE mantenciones_id_seq OWNED BY mantenciones.id")
+    for sentencia in INDICES_ANTERIORES:
+        op.execute(sentencia)
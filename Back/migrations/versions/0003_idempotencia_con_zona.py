@@ -0,0 +1,31 @@
+"""claves_idempotencia.creado con zona horaria.
+
+La API guarda y compara en UTC (datetime.now(timezone.utc)); en Postgres la columna pasa a
+timestamptz, interpretando las filas existentes como UTC. SQLite no distingue el tipo.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        "ALTER TABLE claves_idempotencia ALTER COLUMN creado TYPE timestamptz USING creado AT TIME ZONE 'UTC'"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        "ALTER TABLE claves_idempotencia ALTER COLUMN creado TYPE timestamp USING creado AT TIME ZONE 'UTC'"
+    )
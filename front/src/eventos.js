@@ -0,0 +1,44 @@
+import { useEffect, useRef } from 'react';
+
+const URL_EVENTOS = 'http://localhost:8000/eventos/';
+
+// Aplica un evento de GET /eventos a una lista de filas con id
+export const aplicarEvento = (lista, evento) => {
+  switch (evento.accion) {
+    case 'crear':
+      // La propia pantalla pudo agregar la fila con la respuesta del POST
+      return lista.some(f => f.id === evento.clave)
+        ? lista.map(f => (f.id === evento.clave ? { ...f, ...evento.datos } : f))
+        : [...lista, evento.datos];
+    case 'actualizar':
+      return lista.map(f => (f.id === evento.clave ? { ...f, ...evento.datos } : f));
+    case 'eliminar':
+      return lista.filter(f => f.id !== evento.clave);
+    default:
+      return lista;
+  }
+};
+
+// Mantiene una conexión SSE con los cambios de las entidades indicadas. El navegador reconecta
+// solo y retoma con Last-Event-ID; si el servidor ya no tiene esos eventos, o hubo una carga
+// masiva, llama a recargar para volver a pedir los listados
+export const useEventos = (entidades, alRecibir, recargar) => {
+  const callbacks = useRef({ alRecibir, recargar });
+  callbacks.current = { alRecibir, recargar };
+  const lista = entidades.join(',');
+
+  useEffect(() => {
+    const fuente = new EventSource(`${URL_EVENTOS}?entidades=${lista}`);
+    const manejar = (e) => {
+      const evento = JSON.parse(e.data);
+      if (evento.accion === 'recargar') {
+        callbacks.current.recargar(evento.entidad);
+      } else {
+        callbacks.current.alRecibir(evento);
+      }
+    };
+    lista.split(',').forEach(entidad => fuente.addEventListener(entidad, manejar));
+    fuente.addEventListener('recargar', manejar);
+    return () => fuente.close();
+  }, [lista]);
+};
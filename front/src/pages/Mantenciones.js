@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
+import { aplicarEvento, useEventos } from '../eventos';
 
 const Mantenciones = () => {
   const [mantenciones, setMantenciones] = useState([]);
@@ -23,7 +24,7 @@ const Mantenciones = () => {
 
   const navigate = useNavigate();
 
-  useEffect(() => {
+  const fetchMantenciones = () => {
     fetch('http://localhost:8000/mantenciones')
       .then(res => res.json())
       .then(setMantenciones)
@@ -31,7 +32,9 @@ const Mantenciones = () => {
         console.error('Error fetching mantenciones:', err);
         setMantenciones([]);
       });
+  };
 
+  const fetchVehiculos = () => {
     fetch('http://localhost:8000/vehiculos')
       .then(res => res.json())
       .then(setVehiculos)
@@ -39,6 +42,24 @@ const Mantenciones = () => {
         console.error('Error fetching vehiculos:', err);
         setVehiculos([]);
       });
+  };
+
+  // Cambios de otros usuarios (y el kilometraje que una mantención le sube al vehículo)
+  useEventos(
+    ['mantencion', 'vehiculo'],
+    evento => {
+      const actualizar = evento.entidad === 'mantencion' ? setMantenciones : setVehiculos;
+      actualizar(prev => aplicarEvento(prev, evento));
+    },
+    entidad => {
+      if (entidad !== 'vehiculo') fetchMantenciones();
+      if (entidad !== 'mantencion') fetchVehiculos();
+    }
+  );
+
+  useEffect(() => {
+    fetchMantenciones();
+    fetchVehiculos();
 
     fetch('http://localhost:8000/mantenciones/tipos_mantencion')
       .then(res => res.json())
@@ -124,10 +145,7 @@ const Mantenciones = () => {
 
       if (res.ok) {
         const data = await res.json();
-        const updatedMantenciones = editingId
-          ? mantenciones.map(m => (m.id === editingId ? data : m))
-          : [...mantenciones, data];
-        setMantenciones(updatedMantenciones);
+        setMantenciones(prev => aplicarEvento(prev, { accion: 'crear', clave: data.id, datos: data }));
         resetForm();
         setShowForm(false);
       } else {
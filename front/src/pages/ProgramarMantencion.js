@@ -1,15 +1,23 @@
 import React, { useEffect, useState } from 'react';
+import { aplicarEvento, useEventos } from '../eventos';
 
 const ProgramarMantencion = () => {
   const [programaciones, setProgramaciones] = useState([]);
 
-  useEffect(() => {
+  const fetchProgramaciones = () => {
     fetch('http://localhost:8000/programar-mantenciones') 
       .then(res => res.json())
       .then(data => setProgramaciones(data))
       .catch(err => console.error('Error cargando programación:', err));
+  };
+
+  useEffect(() => {
+    fetchProgramaciones();
   }, []);
 
+  // Cada mantención nueva recalcula las fechas estimadas: llegan como eventos "actualizar"
+  useEventos(['programacion'], evento => setProgramaciones(prev => aplicarEvento(prev, evento)), fetchProgramaciones);
+
   return (
     <div className="p-6 w-full max-w-4xl mx-auto">
       <h2 className="text-2xl font-bold mb-4">📅 Programación de Mantenciones</h2>
@@ -1,5 +1,6 @@
 import React, { useEffect, useMemo, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
+import { aplicarEvento, useEventos } from '../eventos';
 
 const currentYear = new Date().getFullYear();
 
@@ -32,6 +33,13 @@ const Vehiculos = () => {
     fetchVehicles();
   }, []);
 
+  // Los cambios (propios y de otros usuarios) llegan como eventos: no se vuelve a pedir la lista
+  useEventos(
+    ['vehiculo'],
+    evento => setVehicles(prev => [...aplicarEvento(prev, evento)].sort((a, b) => a.patente.localeCompare(b.patente))),
+    fetchVehicles
+  );
+
   const filteredVehicles = useMemo(() => {
     return vehicles.filter(vehicle =>
       vehicle.patente.toLowerCase().includes(search.toLowerCase())
@@ -152,7 +160,6 @@ const Vehiculos = () => {
     });
 
     if (res.ok) {
-      fetchVehicles();
       setForm({ patente: '', marca: '', modelo: '', anio: '', kilometraje: '' });
       setFormErrors({});
       setEditingId(null);
@@ -175,11 +182,9 @@ const Vehiculos = () => {
       method: 'DELETE',
     });
 
-    if (res.ok) {
-      fetchVehicles();
-    } else if (res.status === 400 || res.status === 403) {
+    if (res.status === 400 || res.status === 403) {
       alert('No se puede eliminar el vehículo porque tiene mantenciones asociadas.');
-    } else {
+    } else if (!res.ok) {
       alert('Error al eliminar vehículo.');
     }
   };